@@ -1,10 +1,19 @@
+import argparse
 import datetime
+import os
 import requests
 import json
 import pandas as pd
 from bs4 import BeautifulSoup
 import urllib3
-import time
+from rate_control import AIMDRateController
+from normalize import normalize_records
+from records import RecordBatch
+from matching import update_match_index
+from search_index import update_search_index
+from credential_cache import CredentialCache
+from profiling import stage
+import profiling
 
 # Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -21,8 +30,22 @@ headers = {}
 # Configuration
 TARGET_YEAR = 2025
 MAX_PAGES = 41  # Stop at page 41
+SITE_URL = 'https://akiral2iz6a7qgd3ayp3l6yub7xx2uep76idk3u2kollpj5z3z636bad.onion/'
+NEWS_URL = SITE_URL + 'n'
+LEAK_URL = SITE_URL + 'l'
 OUTPUT_FILE = f"akira_victims_2025_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
+# Encrypted CSRF token / cookie cache shared across runs
+CREDENTIAL_CACHE_FILE = "akira_credentials.cache"
+AUTH_ERROR_CODES = (401, 403, 419)
+credential_cache = CredentialCache(CREDENTIAL_CACHE_FILE)
+
+# Adaptive per-host pacing (replaces the fixed sleeps between pages)
+rate_controller = AIMDRateController(initial_rate=1.0)
+
+# Directory of archived JSON pages (<type>_<page>.json) to run offline, set by --fixtures
+FIXTURE_DIR = None
+
 def stdlog(message):
     """Simple logging function"""
     print(f"[INFO] {message}")
@@ -31,20 +54,10 @@ def errlog(message):
     """Simple error logging function"""
     print(f"[ERROR] {message}")
 
-def is_date_in_2025(date_string):
-    """Check if a date string is from 2025"""
-    if not date_string:
-        return False
-    try:
-        if '2025' in date_string:
-            return True
-        return False
-    except:
-        return False
-
-def fetch_json_from_onion_url(onion_url, cookies, params=None):
+def fetch_json_from_onion_url(onion_url, cookies, params=None, session=None):
     """
     Fetch JSON data from the given onion URL with optional parameters for pagination.
+    A pooled requests.Session can be passed to reuse connections across calls.
     """
     try:
         headers.update({
@@ -64,41 +77,58 @@ def fetch_json_from_onion_url(onion_url, cookies, params=None):
             "X-Requested-With": "XMLHttpRequest"
         })
 
-        response = requests.get(
-            onion_url, 
-            headers=headers, 
-            cookies=cookies, 
-            proxies=proxies, 
-            params=params,
-            verify=False, 
-            timeout=(60, 60)
-        )
+        for attempt in range(2):
+            rate_controller.wait(onion_url)
+            with stage("fetch"):
+                response = (session or requests).get(
+                    onion_url, 
+                    headers=headers, 
+                    cookies=cookies, 
+                    proxies=proxies, 
+                    params=params,
+                    verify=False, 
+                    timeout=(60, 60)
+                )
+            # Stale credentials: refresh once and retry transparently
+            if response.status_code in AUTH_ERROR_CODES and attempt == 0:
+                stdlog(f"Credentials rejected ({response.status_code}), refreshing CSRF token")
+                if refresh_credentials(cookies, session):
+                    continue
+            rate_controller.record(onion_url, response.status_code, response.elapsed.total_seconds())
+            break
         response.raise_for_status()
 
-        json_data = response.json()
+        with stage("decode"):
+            json_data = response.json()
         return json_data
     except requests.exceptions.RequestException as e:
+        if e.response is None:
+            rate_controller.record(onion_url, error=True)
         errlog(f"Error fetching JSON: {e}")
         return None
     except json.JSONDecodeError as e:
         errlog(f"Error parsing JSON: {e}")
         return None
 
-def get_csrf_token(onion_url):
+def get_csrf_token(onion_url, session=None):
     """
     Fetch the CSRF token and cookies from the onion site.
     """
     try:
         stdlog(f"Connecting to: {onion_url}")
         
-        response = requests.get(onion_url, proxies=proxies, verify=False, timeout=(60, 60))
+        rate_controller.wait(onion_url)
+        with stage("fetch"):
+            response = (session or requests).get(onion_url, proxies=proxies, verify=False, timeout=(60, 60))
+        rate_controller.record(onion_url, response.status_code, response.elapsed.total_seconds())
         response.raise_for_status()
         
         stdlog(f"Connection successful")
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        csrf_element = soup.find('meta', {'name': 'csrf-token'})
-        csrf_token = csrf_element['content'] if csrf_element and 'content' in csrf_element.attrs else None
+        with stage("parse"):
+            soup = BeautifulSoup(response.text, 'html.parser')
+            csrf_element = soup.find('meta', {'name': 'csrf-token'})
+            csrf_token = csrf_element['content'] if csrf_element and 'content' in csrf_element.attrs else None
 
         cookies = response.cookies
         
@@ -110,7 +140,53 @@ def get_csrf_token(onion_url):
         errlog(f"Error: {e}")
         return None, None
 
-def fetch_all_pages(base_url, cookies, data_type="news", sort_by="name:desc", max_pages=MAX_PAGES):
+def get_credentials(onion_url, session=None, refresh=False):
+    """
+    Return the CSRF token and cookies, from the encrypted cache unless it is
+    missing, expired or refresh is requested.
+    """
+    if not refresh:
+        csrf_token, cookies = credential_cache.load()
+        if csrf_token and cookies:
+            stdlog("Using cached CSRF token and cookies")
+            return csrf_token, cookies
+
+    csrf_token, cookies = get_csrf_token(onion_url, session)
+    if csrf_token and cookies:
+        credential_cache.save(csrf_token, cookies)
+    else:
+        credential_cache.clear()
+    return csrf_token, cookies
+
+def refresh_credentials(cookies, session=None):
+    """
+    Fetch new credentials after an auth error and apply them in place to the
+    shared headers and the caller's cookie jar.
+    """
+    csrf_token, new_cookies = get_credentials(SITE_URL, session, refresh=True)
+    if not csrf_token:
+        return False
+    headers["X-CSRF-Token"] = csrf_token
+    if cookies is not None:
+        cookies.update(new_cookies)
+    return True
+
+def load_fixture_page(data_type, page):
+    """
+    Load an archived JSON page from FIXTURE_DIR instead of fetching it.
+    """
+    path = os.path.join(FIXTURE_DIR, f"{data_type}_{page}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with stage("decode"):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        errlog(f"Error reading fixture {path}: {e}")
+        return None
+
+def fetch_all_pages(base_url, cookies, data_type="news", sort_by="name:desc", max_pages=MAX_PAGES, session=None):
     """
     Fetch pages up to max_pages limit
     """
@@ -129,7 +205,10 @@ def fetch_all_pages(base_url, cookies, data_type="news", sort_by="name:desc", ma
         
         print(f"[INFO]   Page {page}/{max_pages}...", end=' ')
         
-        json_data = fetch_json_from_onion_url(base_url, cookies, params)
+        if FIXTURE_DIR:
+            json_data = load_fixture_page(data_type, page)
+        else:
+            json_data = fetch_json_from_onion_url(base_url, cookies, params, session)
         
         if not json_data:
             print("Failed")
@@ -138,7 +217,6 @@ def fetch_all_pages(base_url, cookies, data_type="news", sort_by="name:desc", ma
                 stdlog(f"  Stopping after {consecutive_empty} failed attempts")
                 break
             page += 1
-            time.sleep(1)
             continue
         
         if 'objects' in json_data and json_data['objects']:
@@ -154,26 +232,71 @@ def fetch_all_pages(base_url, cookies, data_type="news", sort_by="name:desc", ma
                 break
         
         page += 1
-        time.sleep(1)
     
     stdlog(f"Completed {data_type}: {len(all_entries)} total entries from {page - 1} pages")
     return all_entries
 
-def save_to_excel(data, filename):
-    """Save collected data to Excel"""
-    if not data:
+def in_year(df, raw_dates, year):
+    """
+    Rows dated in year. Dates no format could parse fall back to a substring
+    check on the raw value, as before the schema was typed.
+    """
+    raw = pd.Series(raw_dates, index=df.index, dtype='object').fillna('').astype(str)
+    unparsed = df['Date'].isna() & (raw.str.strip() != '')
+    return (df['Date'].dt.year == year) | (unparsed & raw.str.contains(str(year), regex=False))
+
+def build_news_frame(news_entries, scraped=None, year=None):
+    """Turn raw news entries into normalized records scraped at ``scraped`` (default now), only from ``year`` if given"""
+    with stage("extract"):
+        batch = RecordBatch('akira', scraped)
+        for entry in news_entries:
+            date = entry.get('date', '')
+            batch.append(entry.get('title', '').replace('\n', ''), entry.get('content', ''),
+                         type='News', date=date, published=date)
+
+        # Parse the whole batch at once, then filter on the datetime column
+        news_df = normalize_records(batch)
+        if year is None:
+            return news_df
+        return news_df[in_year(news_df, batch.column('Date'), year)]
+
+def build_leak_frame(leak_entries, scraped=None, year=None):
+    """Turn raw leak entries into normalized records scraped at ``scraped``, only undated or from ``year`` if given"""
+    with stage("extract"):
+        batch = RecordBatch('akira', scraped)
+        for entry in leak_entries:
+            batch.append(entry.get('name', '').replace('\n', ''), entry.get('desc', ''),
+                         type='Leak', date=entry.get('date', ''))
+
+        # Include undated leaks (empty date, not merely unparsed), filter the rest by year
+        leak_df = normalize_records(batch)
+        if year is None:
+            return leak_df
+        raw_dates = batch.column('Date')
+        undated = pd.Series([not str(date).strip() for date in raw_dates], index=leak_df.index)
+        return leak_df[undated | in_year(leak_df, raw_dates, year)]
+
+def save_to_excel(data, filename, update_indexes=True):
+    """Save collected data to Excel; update_indexes=False leaves the match and search indexes alone"""
+    if data is None or len(data) == 0:
         stdlog("No data to save")
         return
     
-    df = pd.DataFrame(data)
-    
-    initial_count = len(df)
-    df = df.drop_duplicates(subset=['Victim Name'], keep='first')
-    
-    if 'Date' in df.columns:
-        df = df.sort_values('Date', ascending=False)
-    
-    df.to_excel(filename, index=False, engine='openpyxl')
+    with stage("write"):
+        df = normalize_records(data)
+        
+        initial_count = len(df)
+        df = df.drop_duplicates(subset=['Victim Name'], keep='first')
+        
+        if 'Date' in df.columns:
+            df = df.sort_values('Date', ascending=False)
+        
+        df.to_excel(filename, index=False, engine='openpyxl')
+
+        # Make this run's victims available for cross-group matching
+        if update_indexes:
+            matched = update_match_index(df)
+            indexed = update_search_index(df)
     
     print("\n" + "="*60)
     print("SCRAPING COMPLETE")
@@ -182,9 +305,25 @@ def save_to_excel(data, filename):
     if initial_count > len(df):
         print(f"Duplicates removed: {initial_count - len(df)}")
     print(f"File saved: {filename}")
+    if update_indexes:
+        print(f"New records in match index: {matched}")
+        print(f"Rows updated in search index: {indexed}")
+    else:
+        print("Match and search indexes not updated (offline run)")
     print("="*60 + "\n")
 
 def main():
+    global FIXTURE_DIR
+    ap = argparse.ArgumentParser(description="Scrape Akira news and leak listings for the target year.")
+    ap.add_argument("--profile", action="store_true", help="Profile each stage and write a .prof file plus a hotspot summary")
+    ap.add_argument("--profile-top", type=int, default=20, help="Number of hotspots in the profile summary")
+    ap.add_argument("--fixtures", help="Read archived JSON pages (news_<n>.json, leaks_<n>.json) from this directory instead of the site")
+    args = ap.parse_args()
+
+    FIXTURE_DIR = args.fixtures
+    if args.profile:
+        profiling.enable("akira", args.profile_top)
+
     print("="*60)
     print("Akira Ransomware Scraper - 2025 Data")
     print(f"Max pages per endpoint: {MAX_PAGES}")
@@ -192,76 +331,54 @@ def main():
     print("="*60)
     print()
     
-    news_url = 'https://akiral2iz6a7qgd3ayp3l6yub7xx2uep76idk3u2kollpj5z3z636bad.onion/n'
-    leak_url = 'https://akiral2iz6a7qgd3ayp3l6yub7xx2uep76idk3u2kollpj5z3z636bad.onion/l'
-    site_onion_url = 'https://akiral2iz6a7qgd3ayp3l6yub7xx2uep76idk3u2kollpj5z3z636bad.onion/'
+    news_url = NEWS_URL
+    leak_url = LEAK_URL
+    site_onion_url = SITE_URL
 
     all_data = []
+    scraped = datetime.datetime.now()  # Scraped Date of every record from this run
 
-    csrf_token, cookies = get_csrf_token(site_onion_url)
+    if FIXTURE_DIR:
+        csrf_token, cookies = None, None
+    else:
+        csrf_token, cookies = get_credentials(site_onion_url)
 
-    if csrf_token and cookies:
-        headers["X-CSRF-Token"] = csrf_token
+    if FIXTURE_DIR or (csrf_token and cookies):
+        if csrf_token:
+            headers["X-CSRF-Token"] = csrf_token
 
         # Fetch NEWS pages (max 41)
         news_entries = fetch_all_pages(news_url, cookies, "news", "date:desc", MAX_PAGES)
         
         if news_entries:
-            news_2025_count = 0
-            for entry in news_entries:
-                title = entry.get('title', '').replace('\n', '')
-                description = entry.get('content', '')
-                date = entry.get('date', '')
-                
-                if is_date_in_2025(date):
-                    all_data.append({
-                        'Victim Name': title,
-                        'Description': description,
-                        'Type': 'News',
-                        'Date': date,
-                        'Published': date + " 00:00:00.000000",
-                        'Group': 'akira',
-                        'Scraped Date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                    news_2025_count += 1
-            
-            stdlog(f"Filtered: {news_2025_count} news entries from 2025 (out of {len(news_entries)} total)")
+            news_df = build_news_frame(news_entries, scraped, TARGET_YEAR)
+            all_data.append(news_df)
+
+            stdlog(f"Filtered: {len(news_df)} news entries from {TARGET_YEAR} (out of {len(news_entries)} total)")
         
         # Fetch LEAK pages (max 41)
         leak_entries = fetch_all_pages(leak_url, cookies, "leaks", "name:desc", MAX_PAGES)
         
         if leak_entries:
-            leak_count = 0
-            for entry in leak_entries:
-                title = entry.get('name', '').replace('\n', '')
-                description = entry.get('desc', '')
-                date = entry.get('date', '')
-                
-                # Include all leaks or filter by date if available
-                if date:
-                    if not is_date_in_2025(date):
-                        continue
-                
-                all_data.append({
-                    'Victim Name': title,
-                    'Description': description,
-                    'Type': 'Leak',
-                    'Date': date if date else '',
-                    'Published': '',
-                    'Group': 'akira',
-                    'Scraped Date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                })
-                leak_count += 1
-            
-            stdlog(f"Collected: {leak_count} leak entries")
+            leak_df = build_leak_frame(leak_entries, scraped, TARGET_YEAR)
+            all_data.append(leak_df)
+
+            stdlog(f"Collected: {len(leak_df)} leak entries")
         
         if all_data:
-            save_to_excel(all_data, OUTPUT_FILE)
+            # Archived fixtures must not end up in the persistent indexes
+            save_to_excel(pd.concat(all_data, ignore_index=True), OUTPUT_FILE, update_indexes=not FIXTURE_DIR)
         else:
             errlog("No data collected")
+
+        rate_controller.report()
         
     else:
         errlog("Failed to fetch CSRF token or cookies")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Write the profile even when the run is aborted or fails
+        profiling.finish()
\ No newline at end of file
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+bench_matching.py
+Benchmark MatchIndex build and query throughput on synthetic victim names.
+
+Usage:
+    python bench_matching.py --records 200000 --queries 5000
+"""
+
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+from matching import MatchIndex
+
+SUFFIXES = ["Inc", "LLC", "Ltd", "GmbH", "Corp", "S.A.", "", "", ""]
+WORDS = ["global", "logistics", "medical", "systems", "partners", "energy", "foods", "legal",
+         "steel", "capital", "dental", "school", "county", "motors", "consulting", "textile"]
+
+
+def synthetic_name(rng: random.Random) -> str:
+    """Random company-like name."""
+    stem = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))).title()
+    words = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(0, 2)))
+    return " ".join(part for part in (stem, words, rng.choice(SUFFIXES)) if part)
+
+
+def perturb(name: str, rng: random.Random) -> str:
+    """Near-duplicate of ``name``: one typo, changed suffix or case."""
+    choice = rng.randint(0, 2)
+    if choice == 0 and len(name) > 3:
+        i = rng.randrange(len(name))
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+    if choice == 1:
+        return name.rsplit(" ", 1)[0] + " " + rng.choice(SUFFIXES)
+    return name.upper()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the victim matching index.")
+    ap.add_argument("--records", type=int, default=100000, help="Number of indexed records")
+    ap.add_argument("--queries", type=int, default=5000, help="Number of near-duplicate lookups")
+    ap.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    groups = ["akira", "play", "qilin"]
+    names = [synthetic_name(rng) for _ in range(args.records)]
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_match.db")
+    index = MatchIndex(path)
+    start = time.perf_counter()
+    index.insert_records((f"{groups[i % 3]}:{i}", name, "", groups[i % 3]) for i, name in enumerate(names))
+    build = time.perf_counter() - start
+    print(f"Build: {args.records} records in {build:.2f}s ({args.records / build:,.0f} inserts/s), "
+          f"{os.path.getsize(path) / 2**20:.1f} MB on disk")
+
+    # What a scraper run pays: open the existing index and add a few dozen names
+    index.close()
+    start = time.perf_counter()
+    index = MatchIndex(path)
+    added = index.insert_records((f"new:{i}", synthetic_name(rng), "", "new") for i in range(50))
+    print(f"Incremental: opened and added {added} records in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    sample = rng.sample(range(args.records), min(args.queries, args.records))
+    found = 0
+    start = time.perf_counter()
+    for i in sample:
+        hits = index.query(perturb(names[i], rng))
+        found += any(key == f"{groups[i % 3]}:{i}" for key, _ in hits)
+    query = time.perf_counter() - start
+    print(f"Query: {len(sample)} lookups in {query:.2f}s ({len(sample) / query:,.0f} queries/s, "
+          f"{query / len(sample) * 1000:.2f} ms each)")
+    print(f"Recall on perturbed names: {found / len(sample):.1%}")
+
+
+if __name__ == "__main__":
+    main()
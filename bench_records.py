@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+bench_records.py
+Compare per-row dicts with RecordBatch on a synthetic backfill.
+
+Each mode runs in its own subprocess so peak RSS is measured separately.
+Reports peak RSS, tracemalloc peak and the number of live allocations
+once all rows are built, plus the time to build them and convert them
+to a DataFrame.
+
+Usage:
+    python bench_records.py --records 100000
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from records import RecordBatch
+
+
+def synthetic_entries(n: int):
+    """Rows shaped like an akira/play listing."""
+    for i in range(n):
+        yield (f"Victim Company {i} Ltd", f"Description of victim {i}. " * 4, f"victim{i}.com",
+               f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"http://play.onion/topic.php?id={i:010d}")
+
+
+def build_dicts(n: int):
+    rows = []
+    for victim, description, website, date, post_url in synthetic_entries(n):
+        rows.append({
+            'Victim Name': victim,
+            'Description': description,
+            'Website': website,
+            'Added Date': date,
+            'Publication Date': '',
+            'Post URL': post_url,
+            'Group': 'play',
+            'Scraped Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+    return rows
+
+
+def build_batch(n: int):
+    batch = RecordBatch('play')
+    for victim, description, website, date, post_url in synthetic_entries(n):
+        batch.append(victim, description, website, date=date, post_url=post_url)
+    return batch
+
+
+def run_mode(mode: str, n: int, trace: bool):
+    import pandas as pd
+
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    data = build_dicts(n) if mode == "dicts" else build_batch(n)
+    built = time.perf_counter() - start
+    blocks = 0
+    peak = 0
+    if trace:
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    start = time.perf_counter()
+    df = pd.DataFrame(data) if mode == "dicts" else data.to_frame()
+    converted = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    line = f"{mode:<6} build {built:6.2f}s  to_frame {converted:5.2f}s  peak RSS {rss:7.1f} MB"
+    if trace:
+        line += f"  traced peak {peak / 2**20:7.1f} MB  live blocks {blocks:,}"
+    print(line + f"  ({len(df)} rows)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark per-row dicts against RecordBatch.")
+    ap.add_argument("--records", type=int, default=100000, help="Number of synthetic records")
+    ap.add_argument("--mode", choices=["dicts", "batch"], help="Run a single mode in this process")
+    ap.add_argument("--no-trace", action="store_true", help="Skip tracemalloc (faster, RSS only)")
+    args = ap.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.records, not args.no_trace)
+        return
+    for mode in ("dicts", "batch"):
+        cmd = [sys.executable, __file__, "--mode", mode, "--records", str(args.records)]
+        if args.no_trace:
+            cmd.append("--no-trace")
+        subprocess.run(cmd, check=True)
+
+
+if __name__ == "__main__":
+    main()
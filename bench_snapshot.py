@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+bench_snapshot.py
+Compare the tree and streaming qilin snapshot parsers on a synthetic listing.
+
+Each mode runs in its own subprocess so peak RSS is measured separately.
+Reports the time to extract every item_box, peak RSS, and a digest of the
+extracted rows so both parsers can be checked to agree.
+
+Usage:
+    python bench_snapshot.py --boxes 50000
+"""
+
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from qilin_snapshot import DATE_CLASS, parse_boxes, stream_boxes
+
+BOX = """<div class="item_box">
+  <a class="item_box-title" href="/site/view?uuid={i:08d}">Victim Company {i} Ltd</a>
+  <div class="{date_class}"><span>views</span> {views}</div>
+  <div class="{date_class}"><span>date</span> 2025-{month:02d}-{day:02d}</div>
+  <a class="item_box-info__link" href="https://victim{i}.com">victim{i}.com</a>
+  <div class="item_box_text">Description of victim {i}. {filler}</div>
+  <a class="learn_more" href="/site/view?uuid={i:08d}">Learn more</a>
+</div>
+"""
+
+
+def write_snapshot(path: str, boxes: int):
+    """Listing page shaped like an archived qilin snapshot."""
+    with open(path, "w") as f:
+        f.write("<html><head><title>qilin</title></head><body><div class='container'>\n")
+        for i in range(boxes):
+            f.write(BOX.format(i=i, date_class=DATE_CLASS, views=i * 7, month=i % 12 + 1,
+                               day=i % 28 + 1, filler="Lorem ipsum dolor sit amet. " * 8))
+        f.write("</div></body></html>\n")
+
+
+def run_mode(mode: str, path: str):
+    digest = hashlib.md5()
+    start = time.perf_counter()
+    count = 0
+    for box in (stream_boxes(path) if mode == "stream" else parse_boxes(path)):
+        digest.update("\x1f".join(box).encode())
+        count += 1
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<6} {count} boxes in {elapsed:6.2f}s  peak RSS {rss:7.1f} MB  digest {digest.hexdigest()[:12]}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark tree against streaming qilin snapshot parsing.")
+    ap.add_argument("--boxes", type=int, default=50000, help="Number of item_box entries in the snapshot")
+    ap.add_argument("--snapshot", help="Parse this file instead of a synthetic one")
+    ap.add_argument("--mode", choices=["tree", "stream"], help="Run a single mode in this process")
+    args = ap.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.snapshot)
+        return
+    path = args.snapshot
+    if not path:
+        fd, path = tempfile.mkstemp(prefix="qilin-", suffix=".html")
+        os.close(fd)
+        write_snapshot(path, args.boxes)
+    print(f"{path}: {os.path.getsize(path) / 2**20:.1f} MB")
+    try:
+        for mode in ("tree", "stream"):
+            subprocess.run([sys.executable, __file__, "--mode", mode, "--snapshot", path], check=True)
+    finally:
+        if not args.snapshot:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
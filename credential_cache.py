@@ -0,0 +1,120 @@
+"""
+credential_cache.py
+Encrypted on-disk cache for a site's CSRF token and cookie jar.
+
+The cache is a Fernet token (AES-128-CBC + HMAC) holding the CSRF token,
+the cookies and an expiry time. The key comes from the SCRAPER_CACHE_KEY
+environment variable or, failing that, from a key file next to the cache
+that is created with 0600 permissions on first use.
+"""
+
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken
+from requests.cookies import RequestsCookieJar, create_cookie
+
+KEY_ENV = "SCRAPER_CACHE_KEY"
+
+
+class CredentialCache:
+    """Persisted CSRF token + cookies with an expiry."""
+
+    def __init__(self, path: str, ttl: float = 12 * 3600, key: Optional[bytes] = None):
+        self.path = path
+        self.ttl = ttl
+        self._key = key
+
+    def _fernet(self) -> Fernet:
+        if self._key is None:
+            env_key = os.getenv(KEY_ENV)
+            if env_key:
+                self._key = env_key.encode()
+            else:
+                self._key = self._load_or_create_key(self.path + ".key")
+        return Fernet(self._key)
+
+    @staticmethod
+    def _read_key(key_path: str) -> bytes:
+        # The creator may not have written it yet
+        for _ in range(50):
+            with open(key_path, "rb") as f:
+                key = f.read().strip()
+            if key:
+                return key
+            time.sleep(0.01)
+        raise ValueError(f"empty cache key file {key_path}")
+
+    @staticmethod
+    def _load_or_create_key(key_path: str) -> bytes:
+        if os.path.exists(key_path):
+            return CredentialCache._read_key(key_path)
+        key = Fernet.generate_key()
+        try:
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # Another process created it first; use its key
+            return CredentialCache._read_key(key_path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        return key
+
+    def load(self) -> Tuple[Optional[str], Optional[RequestsCookieJar]]:
+        """Return the cached (token, cookies), or (None, None) if missing, expired or unreadable."""
+        if not os.path.exists(self.path):
+            return None, None
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(self._fernet().decrypt(f.read()))
+        except (OSError, ValueError, InvalidToken):
+            return None, None
+        if data.get("expires_at", 0) <= time.time():
+            return None, None
+        cookies = RequestsCookieJar()
+        for cookie in data.get("cookies", []):
+            cookies.set_cookie(create_cookie(**cookie))
+        return data.get("token"), cookies
+
+    def save(self, token: str, cookies: RequestsCookieJar) -> bool:
+        """
+        Encrypt and store the token and cookies; expires after ttl or the first
+        cookie expiry. Returns False (and logs) if the cache could not be written.
+        """
+        expires_at = time.time() + self.ttl
+        cookie_list = []
+        for cookie in cookies:
+            if cookie.expires:
+                expires_at = min(expires_at, cookie.expires)
+            cookie_list.append({
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "expires": cookie.expires,
+                "rest": {"HttpOnly": None} if cookie.has_nonstandard_attr("HttpOnly") else {},
+            })
+        payload = json.dumps({"token": token, "cookies": cookie_list, "expires_at": expires_at}).encode()
+        tmp_path = self.path + ".tmp"
+        try:
+            encrypted = self._fernet().encrypt(payload)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(encrypted)
+            os.replace(tmp_path, self.path)
+        except (OSError, ValueError) as e:
+            # The cache only saves a round-trip; never fail the run over it
+            print(f"Could not write credential cache {self.path}: {e}")
+            return False
+        return True
+
+    def clear(self):
+        """Forget the cached credentials."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove credential cache {self.path}: {e}")
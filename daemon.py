@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+daemon.py
+Long-running poller that scrapes every group on a schedule.
+
+Sessions, cookies and the akira CSRF token are kept alive between polls
+(the token also survives restarts through akira's encrypted credential
+cache) and are only refreshed when the site rejects them or a poll comes
+back empty, so each poll costs little more than the listing fetch itself.
+The daemon never prompts; a failed Tor check is only logged.
+
+New victims are appended to <out-dir>/<group>_victims.csv and added to the
+cross-group match and search indexes. The qilin listing is also kept as a
+snapshot (<out-dir>/snapshots/qilin-<md5>.html) for qilin.py.
+
+Usage:
+    python daemon.py --interval 1800 --groups akira,play,qilin --out-dir data
+"""
+
+import abc
+import argparse
+import hashlib
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Set
+
+import pandas as pd
+import requests
+
+import akira
+import play
+import qilin_scrape_url
+from matching import update_match_index
+from search_index import update_search_index
+from normalize import normalize_records
+from qilin_snapshot import iter_batches
+from rate_control import AIMDRateController
+
+QILIN_URL = "http://ijzn3sicrcy7guixkzjkib4ukbiilwc3xhnmby4mcbccnsd7j2rekvqd.onion"
+
+
+def log(message: str):
+    """Timestamped daemon log line."""
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+class GroupPoller(abc.ABC):
+    """Base class: one group, its pooled session and its schedule."""
+
+    name = ""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_run = 0.0
+        self.session = self.make_session()
+
+    def make_session(self) -> requests.Session:
+        return requests.Session()
+
+    def reset_session(self):
+        """Drop the pooled session (and everything cached on it)."""
+        self.session.close()
+        self.session = self.make_session()
+
+    @abc.abstractmethod
+    def poll(self, scraped: datetime) -> Optional[pd.DataFrame]:
+        """Fetch the listing; ``scraped`` is the Scraped Date of this poll's records."""
+
+
+class AkiraPoller(GroupPoller):
+    """Polls the first pages of akira news and leaks, reusing the CSRF token and cookies."""
+
+    name = "akira"
+
+    def __init__(self, interval: float, pages: int, token_ttl: float):
+        super().__init__(interval)
+        self.pages = pages
+        akira.credential_cache.ttl = token_ttl
+        self.token_ttl = token_ttl
+        self.token_expires = 0.0
+        self.csrf_token = None
+        self.cookies = None
+
+    def make_session(self) -> requests.Session:
+        session = requests.Session()
+        session.proxies.update(akira.proxies)
+        return session
+
+    def ensure_token(self) -> bool:
+        """
+        Reuse the credentials for --token-ttl seconds, then reload them (from
+        akira's cache if it is still valid). Refreshes after 401/403/419 are
+        applied in place by akira.
+        """
+        if self.csrf_token:
+            if time.time() < self.token_expires:
+                return True
+            log("akira: token older than --token-ttl, reloading credentials")
+            self.csrf_token = None
+        self.csrf_token, self.cookies = akira.get_credentials(akira.SITE_URL, self.session)
+        if not (self.csrf_token and self.cookies):
+            self.csrf_token = None
+            return False
+        akira.headers["X-CSRF-Token"] = self.csrf_token
+        self.token_expires = time.time() + self.token_ttl
+        return True
+
+    def poll(self, scraped: datetime) -> Optional[pd.DataFrame]:
+        if not self.ensure_token():
+            return None
+        news = akira.fetch_all_pages(akira.NEWS_URL, self.cookies, "news", "date:desc", self.pages, self.session)
+        leaks = akira.fetch_all_pages(akira.LEAK_URL, self.cookies, "leaks", "name:desc", self.pages, self.session)
+        if not news and not leaks:
+            # Most likely a stale token or session; rebuild both next time
+            self.csrf_token = None
+            akira.credential_cache.clear()
+            self.reset_session()
+            return None
+        frames = []
+        if news:
+            frames.append(akira.build_news_frame(news, scraped))
+        if leaks:
+            frames.append(akira.build_leak_frame(leaks, scraped))
+        return pd.concat(frames, ignore_index=True)
+
+
+class PlayPoller(GroupPoller):
+    """Polls the Play listing, sticking to the last mirror that answered."""
+
+    name = "play"
+
+    def __init__(self, interval: float, enrich_workers: int = 0):
+        super().__init__(interval)
+        self.mirrors = list(play.MIRROR_URLS)
+        self.enrich_workers = enrich_workers
+
+    def make_session(self) -> requests.Session:
+        session = requests.Session()
+        session.proxies.update(play.PROXIES)
+        return session
+
+    def poll(self, scraped: datetime) -> Optional[pd.DataFrame]:
+        for i, url in enumerate(self.mirrors):
+            victims = play.scrape_play_main_page(url, self.session, scraped)
+            if victims:
+                # Try the working mirror first next time
+                self.mirrors.insert(0, self.mirrors.pop(i))
+                if self.enrich_workers:
+                    play.enrich_victims(victims, self.enrich_workers)
+                return normalize_records(victims)
+        self.reset_session()
+        return None
+
+
+class QilinPoller(GroupPoller):
+    """Polls the qilin listing over a persistent session, keeping it as a snapshot."""
+
+    name = "qilin"
+
+    def __init__(self, interval: float, socks_host: str, socks_port: int, control_port: int, snapshot_dir: str):
+        self.socks_host = socks_host
+        self.socks_port = socks_port
+        self.control_port = control_port
+        self.snapshot_dir = snapshot_dir
+        self.controller = AIMDRateController()
+        super().__init__(interval)
+
+    def make_session(self) -> requests.Session:
+        return qilin_scrape_url.make_session(self.socks_host, self.socks_port)
+
+    def poll(self, scraped: datetime) -> Optional[pd.DataFrame]:
+        html = qilin_scrape_url.fetch(self.session, QILIN_URL, retries=3, control_port=self.control_port,
+                                      controller=self.controller)
+        if not html:
+            self.reset_session()
+            return None
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = os.path.join(self.snapshot_dir, f"qilin-{hashlib.md5(QILIN_URL.encode()).hexdigest()}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        log(f"qilin: snapshot saved to {path}")
+        frames = [normalize_records(batch) for batch in iter_batches(path, self.name, QILIN_URL, scraped=scraped)]
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+
+class Daemon:
+    """Runs the pollers on their schedules until stopped."""
+
+    def __init__(self, pollers: List[GroupPoller], out_dir: str):
+        self.pollers = pollers
+        self.out_dir = out_dir
+        self.stop_event = threading.Event()
+        self.seen = {poller.name: self.load_seen(poller.name) for poller in pollers}
+
+    def output_file(self, group: str) -> str:
+        return os.path.join(self.out_dir, f"{group}_victims.csv")
+
+    def load_seen(self, group: str) -> Set[str]:
+        """Victim names already written for ``group`` by earlier runs."""
+        path = self.output_file(group)
+        if not os.path.exists(path):
+            return set()
+        try:
+            return set(pd.read_csv(path, usecols=["Victim Name"])["Victim Name"].dropna().astype(str))
+        except Exception as e:
+            log(f"{group}: could not read {path}: {e}")
+            return set()
+
+    def write_new(self, group: str, df: pd.DataFrame) -> int:
+        """Append victims not seen before; returns how many were new."""
+        seen = self.seen[group]
+        df = df.drop_duplicates(subset=["Victim Name"])
+        new = df[~df["Victim Name"].astype(str).isin(seen)]
+        if new.empty:
+            return 0
+        path = self.output_file(group)
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            # Keep appended rows aligned with the header written by an earlier run
+            # (e.g. --play-enrich adds columns when toggled on)
+            new = new.reindex(columns=pd.read_csv(path, nrows=0).columns)
+        new.to_csv(path, mode="a", header=not exists, index=False)
+        seen.update(new["Victim Name"].astype(str))
+        update_match_index(new)
+        update_search_index(new)
+        return len(new)
+
+    def run_poller(self, poller: GroupPoller):
+        start = time.monotonic()
+        try:
+            df = poller.poll(datetime.now())
+        except Exception as e:
+            log(f"{poller.name}: poll failed: {e}")
+            df = None
+        elapsed = time.monotonic() - start
+        try:
+            new = self.write_new(poller.name, df) if df is not None and not df.empty else 0
+        except Exception as e:
+            # Not marked as seen, so the victims are written by the next successful poll
+            log(f"{poller.name}: could not write new victims: {e}")
+            new = 0
+        log(f"{poller.name}: poll took {elapsed:.1f}s, {new} new victims")
+
+    def run(self, once: bool = False):
+        if not self.pollers:
+            log("no groups to poll")
+            return
+        os.makedirs(self.out_dir, exist_ok=True)
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            for poller in self.pollers:
+                if poller.next_run <= now and not self.stop_event.is_set():
+                    self.run_poller(poller)
+                    poller.next_run = time.monotonic() + poller.interval
+            if once:
+                break
+            wait = max(0.0, min(poller.next_run for poller in self.pollers) - time.monotonic())
+            self.stop_event.wait(wait)
+        log("daemon stopped")
+
+    def stop(self, *_):
+        """Finish the current poll, then exit; a second signal interrupts the poll."""
+        log("stop requested, finishing the current poll (signal again to abort it)")
+        self.stop_event.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Poll all leak sites on a schedule with warm sessions.")
+    ap.add_argument("--groups", default="akira,play,qilin", help="Comma separated groups to poll")
+    ap.add_argument("--interval", type=float, default=1800, help="Seconds between polls of a group")
+    ap.add_argument("--out-dir", default="data", help="Directory for per-group CSV files and snapshots")
+    ap.add_argument("--akira-pages", type=int, default=2, help="Akira pages per endpoint and poll")
+    ap.add_argument("--play-enrich", type=int, default=0, metavar="WORKERS", help="Enrich new Play topics with this many concurrent detail page fetches (0 = off)")
+    ap.add_argument("--token-ttl", type=float, default=3600, help="Lifetime of the cached akira CSRF token in seconds")
+    ap.add_argument("--socks-host", default="127.0.0.1", help="Tor SOCKS host (qilin)")
+    ap.add_argument("--socks-port", type=int, default=9150, help="Tor SOCKS port (qilin)")
+    ap.add_argument("--control-port", type=int, default=9051, help="Tor control port for IP renewal")
+    ap.add_argument("--once", action="store_true", help="Poll every group once and exit")
+    args = ap.parse_args()
+
+    pollers = []
+    for group in [g.strip() for g in args.groups.split(",") if g.strip()]:
+        if group == "akira":
+            pollers.append(AkiraPoller(args.interval, args.akira_pages, args.token_ttl))
+        elif group == "play":
+            pollers.append(PlayPoller(args.interval, args.play_enrich))
+        elif group == "qilin":
+            pollers.append(QilinPoller(args.interval, args.socks_host, args.socks_port, args.control_port,
+                                       os.path.join(args.out_dir, "snapshots")))
+        else:
+            ap.error(f"unknown group: {group}")
+    if not pollers:
+        ap.error("no groups to poll")
+
+    if not play.test_connection():
+        log("Tor connection test failed, polling anyway")
+
+    daemon = Daemon(pollers, args.out_dir)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run(once=args.once)
+
+    for poller in pollers:
+        poller.session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+loadtest.py
+Drive the real scraper code against onion_sim.py and report throughput
+and tail latency, so concurrency and backoff settings can be tuned and
+regression-tested offline.
+
+Scenarios:
+  qilin-urls   qilin_scrape_url.fetch() + extract_information() over N post URLs
+  akira-pages  akira CSRF bootstrap + fetch_all_pages() pagination and stop rules
+  play-enrich  Play listing + concurrent topic.php enrichment
+
+Usage:
+    python loadtest.py qilin-urls --requests 200 --concurrency 8 --drop 0.05 --captcha-burst 0.02,4
+    python loadtest.py akira-pages --latency exp:0.3 --json results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from onion_sim import FakeSites, OnionSimulator, add_fault_arguments, faults_from_args
+from rate_control import AIMDRateController
+
+QILIN_HOST = "ijzn3sicrcy7guixkzjkib4ukbiilwc3xhnmby4mcbccnsd7j2rekvqd.onion"
+AKIRA_SITE = "http://akiral2iz6a7qgd3ayp3l6yub7xx2uep76idk3u2kollpj5z3z636bad.onion/"
+
+
+class Timings:
+    """Thread-safe latency samples plus success/failure counts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: List[float] = []
+        self.ok = 0
+        self.failed = 0
+
+    def add(self, seconds: float, ok: bool):
+        with self.lock:
+            self.samples.append(seconds)
+            if ok:
+                self.ok += 1
+            else:
+                self.failed += 1
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        samples = sorted(self.samples)
+
+        def pct(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+        return {
+            "requests": len(samples),
+            "ok": self.ok,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+            "p50_s": round(pct(50), 3),
+            "p90_s": round(pct(90), 3),
+            "p99_s": round(pct(99), 3),
+            "max_s": round(samples[-1], 3) if samples else 0.0,
+        }
+
+
+def run_qilin_urls(args, sim: OnionSimulator, timings: Timings):
+    import qilin_scrape_url
+    from bs4 import BeautifulSoup
+
+    controller = AIMDRateController(initial_rate=args.initial_rate, max_rate=args.max_rate)
+    local = threading.local()
+
+    def one(i: int):
+        if not hasattr(local, "session"):
+            local.session = qilin_scrape_url.make_session("127.0.0.1", sim.socks_port)
+        url = f"http://{QILIN_HOST}/site/view?uuid={i:08d}"
+        start = time.perf_counter()
+        html = qilin_scrape_url.fetch(local.session, url, retries=args.retries, control_port=args.control_port,
+                                      controller=controller)
+        ok = bool(html) and bool(qilin_scrape_url.extract_information(BeautifulSoup(html, "lxml")))
+        timings.add(time.perf_counter() - start, ok)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    return controller
+
+
+def run_akira_pages(args, sim: OnionSimulator, timings: Timings):
+    import akira
+    from credential_cache import CredentialCache
+
+    proxy = f"socks5h://127.0.0.1:{sim.socks_port}"
+    akira.proxies = {"http": proxy, "https": proxy}
+    akira.SITE_URL = AKIRA_SITE
+    akira.rate_controller = AIMDRateController(initial_rate=args.initial_rate, max_rate=args.max_rate)
+    akira.credential_cache = CredentialCache(os.path.join(tempfile.mkdtemp(), "akira.cache"))
+
+    original = akira.fetch_json_from_onion_url
+
+    def timed(*a, **kw):
+        start = time.perf_counter()
+        data = original(*a, **kw)
+        timings.add(time.perf_counter() - start, data is not None)
+        return data
+
+    akira.fetch_json_from_onion_url = timed
+    try:
+        token, cookies = akira.get_credentials(AKIRA_SITE)
+        if token:
+            akira.headers["X-CSRF-Token"] = token
+        entries = akira.fetch_all_pages(AKIRA_SITE + "n", cookies, "news", "date:desc", args.pages)
+    finally:
+        akira.fetch_json_from_onion_url = original
+    return {"entries": len(entries), "expected_entries": sim.sites.akira_pages * sim.sites.per_page,
+            "controller": akira.rate_controller}
+
+
+def run_play_enrich(args, sim: OnionSimulator, timings: Timings):
+    import play
+
+    proxy = f"socks5h://127.0.0.1:{sim.socks_port}"
+    play.PROXIES = {"http": proxy, "https": proxy}
+    play.rate_controller = AIMDRateController(initial_rate=args.initial_rate, max_rate=args.max_rate)
+    victims = play.scrape_play_main_page(play.MIRROR_URLS[0])
+    if not victims:
+        return {"victims": 0, "controller": play.rate_controller}
+
+    original = play.fetch_topic
+
+    def timed(post_url):
+        start = time.perf_counter()
+        fields = original(post_url)
+        timings.add(time.perf_counter() - start, fields is not None)
+        return fields
+
+    play.fetch_topic = timed
+    try:
+        play.enrich_victims(victims, args.concurrency, os.path.join(tempfile.mkdtemp(), "topics.json"))
+    finally:
+        play.fetch_topic = original
+    enriched = sum(1 for size in victims.column("Leak Size") if size)
+    return {"victims": len(victims), "enriched": enriched, "controller": play.rate_controller}
+
+
+SCENARIOS = {
+    "qilin-urls": run_qilin_urls,
+    "akira-pages": run_akira_pages,
+    "play-enrich": run_play_enrich,
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test the scrapers against the local onion simulator.")
+    ap.add_argument("scenario", choices=sorted(SCENARIOS), help="What to exercise")
+    ap.add_argument("--requests", type=int, default=100, help="Number of URLs (qilin-urls)")
+    ap.add_argument("--concurrency", type=int, default=4, help="Worker threads (qilin-urls, play-enrich)")
+    ap.add_argument("--retries", type=int, default=3, help="fetch() retries (qilin-urls)")
+    ap.add_argument("--pages", type=int, default=10, help="Max pages to request (akira-pages)")
+    ap.add_argument("--site-pages", type=int, default=5, help="Pages of data the fake akira site has")
+    ap.add_argument("--play-victims", type=int, default=100, help="Victims on the fake Play listing")
+    ap.add_argument("--initial-rate", type=float, default=2.0, help="Initial requests/s per host")
+    ap.add_argument("--max-rate", type=float, default=20.0, help="Maximum requests/s per host")
+    ap.add_argument("--control-port", type=int, default=1, help="Tor control port (unused port makes NEWNYM a no-op)")
+    ap.add_argument("--json", help="Also write the results to this JSON file")
+    ap.add_argument("--verbose", action="store_true", help="Show the scrapers' own output")
+    add_fault_arguments(ap)
+    args = ap.parse_args()
+
+    sites = FakeSites(akira_pages=args.site_pages, play_victims=args.play_victims)
+    sim = OnionSimulator(faults_from_args(args), sites).start()
+    timings = Timings()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    try:
+        with output:
+            extra = SCENARIOS[args.scenario](args, sim, timings)
+    finally:
+        elapsed = time.perf_counter() - start
+        sim.stop()
+
+    results = {"scenario": args.scenario, **timings.summary(elapsed), "faults": dict(sim.faults.stats)}
+    controller = extra.pop("controller", None) if isinstance(extra, dict) else extra
+    if isinstance(extra, dict):
+        results.update(extra)
+    if controller is not None:
+        results["rates"] = controller.metrics()
+
+    for key, value in results.items():
+        print(f"{key:>18}: {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+matching.py
+Cross-group victim matching with a character n-gram MinHash LSH index.
+
+Victim names are normalized (case, punctuation, legal suffixes) and split
+into character n-grams; each record gets a MinHash signature that is
+banded into LSH buckets, so a lookup only compares against the handful of
+records sharing a bucket instead of the whole corpus. Websites are
+matched exactly on their normalized domain. The index is a SQLite file
+that every run appends to.
+
+Usage:
+    python matching.py link akira.xlsx play.xlsx qilin.csv --out links.csv
+    python matching.py add victims.xlsx --index victims_match.db
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import zlib
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+MATCH_INDEX_FILE = "victims_match.db"
+
+# Suffixes dropped from company names before shingling
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company",
+    "gmbh", "ag", "sa", "sas", "srl", "spa", "bv", "nv", "plc", "pty", "kg", "oy", "ab", "as",
+    "sl", "sro", "llp", "lp", "group", "holdings",
+}
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase, strip punctuation and legal suffixes from a victim name."""
+    if not name:
+        return ""
+    words = re.sub(r"[^\w\s]", " ", str(name).lower()).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def normalize_website(website: Optional[str]) -> str:
+    """Reduce a website to its bare domain (no scheme, www. or path)."""
+    if not website:
+        return ""
+    domain = re.sub(r"^[a-z]+://", "", str(website).strip().lower())
+    domain = domain.split("/", 1)[0].split(":", 1)[0]
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def shingles(text: str, n: int = 3) -> Set[str]:
+    """Character n-grams of ``text`` (the whole string if shorter than n)."""
+    text = f" {text} "
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+@lru_cache(maxsize=200000)
+def cached_shingles(text: str, n: int = 3) -> FrozenSet[str]:
+    """shingles() memoized for candidate names read back from the index."""
+    return frozenset(shingles(text, n))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL DEFAULT '',
+    website TEXT NOT NULL DEFAULT '',
+    grp TEXT NOT NULL DEFAULT '',
+    norm TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    record_id INTEGER NOT NULL,
+    PRIMARY KEY (band, hash, record_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS websites (
+    domain TEXT NOT NULL,
+    record_id INTEGER NOT NULL,
+    PRIMARY KEY (domain, record_id)
+) WITHOUT ROWID;
+"""
+
+# Parameters the stored signatures depend on; an existing index keeps its own
+SIGNATURE_PARAMS = ("bands", "rows", "ngram", "seed")
+
+
+class MatchIndex:
+    """MinHash LSH index over normalized victim names plus an exact website map.
+
+    ``bands * rows`` permutations are used; with the defaults (16 x 4) pairs
+    above a Jaccard similarity of ~0.5 collide in at least one band with high
+    probability. Records, band buckets and domains live in SQLite, so each
+    run only writes its new records, concurrent writers are serialized by
+    SQLite's locking, and the index is never fully loaded into memory.
+    """
+
+    def __init__(self, path: str = ":memory:", bands: int = 16, rows: int = 4, ngram: int = 3,
+                 threshold: float = 0.6, seed: int = 1):
+        self.path = path
+        self.threshold = threshold
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA_SQL)
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)",
+                                  zip(SIGNATURE_PARAMS, (bands, rows, ngram, seed)))
+        params = dict(self.conn.execute("SELECT name, value FROM meta"))
+        self.bands, self.rows, self.ngram, seed = (params[name] for name in SIGNATURE_PARAMS)
+        rng = np.random.RandomState(seed)
+        num_perm = self.bands * self.rows
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def signature(self, shingle_set: Set[str]) -> np.ndarray:
+        """MinHash signature of a shingle set, computed for all permutations at once."""
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _MERSENNE_PRIME for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray) -> Iterable[Tuple[int, int]]:
+        # Each band's rows are hashed to one signed 64-bit integer for a compact SQLite key
+        for band in range(self.bands):
+            digest = hashlib.blake2b(sig[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8)
+            yield band, int.from_bytes(digest.digest(), "big", signed=True)
+
+    def _insert(self, key: str, name: str, website: str, group: str) -> bool:
+        norm = normalize_name(name)
+        cursor = self.conn.execute("INSERT OR IGNORE INTO records (key, name, website, grp, norm) "
+                                   "VALUES (?, ?, ?, ?, ?)", (key, name, website, group, norm))
+        if cursor.rowcount != 1:
+            return False
+        record_id = cursor.lastrowid
+        if norm:
+            sig = self.signature(shingles(norm, self.ngram))
+            self.conn.executemany("INSERT OR IGNORE INTO buckets (band, hash, record_id) VALUES (?, ?, ?)",
+                                  ((band, value, record_id) for band, value in self._band_keys(sig)))
+        domain = normalize_website(website)
+        if domain:
+            self.conn.execute("INSERT OR IGNORE INTO websites (domain, record_id) VALUES (?, ?)",
+                              (domain, record_id))
+        return True
+
+    def insert(self, key: str, name: str, website: str = "", group: str = "") -> bool:
+        """Add one record; returns False if ``key`` is already indexed."""
+        with self.conn:
+            return self._insert(key, name, website, group)
+
+    def insert_records(self, records: Iterable[Tuple[str, str, str, str]]) -> int:
+        """Add ``(key, name, website, group)`` records in one transaction; returns the number added."""
+        with self.conn:
+            return sum(self._insert(*record) for record in records)
+
+    def insert_frame(self, df: pd.DataFrame) -> int:
+        """Insert the rows of a scraper DataFrame; returns the number of new records."""
+        websites = df["Website"] if "Website" in df.columns else pd.Series("", index=df.index)
+        records = []
+        for name, website, group in zip(df["Victim Name"], websites, df["Group"]):
+            name = "" if pd.isna(name) else str(name)
+            website = "" if pd.isna(website) else str(website)
+            records.append((record_key(group, name), name, website, str(group)))
+        return self.insert_records(records)
+
+    def query(self, name: str, website: str = "", threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Return ``(key, similarity)`` for indexed records matching ``name`` or ``website``."""
+        threshold = self.threshold if threshold is None else threshold
+        hits: Dict[str, float] = {}
+        domain = normalize_website(website)
+        if domain:
+            for (key,) in self.conn.execute("SELECT r.key FROM websites w JOIN records r ON r.id = w.record_id "
+                                            "WHERE w.domain = ?", (domain,)):
+                hits[key] = 1.0
+        norm = normalize_name(name)
+        if norm:
+            shingle_set = shingles(norm, self.ngram)
+            band_keys = list(self._band_keys(self.signature(shingle_set)))
+            candidates = dict(self.conn.execute(
+                "SELECT DISTINCT r.key, r.norm FROM buckets b JOIN records r ON r.id = b.record_id WHERE "
+                + " OR ".join(["(b.band = ? AND b.hash = ?)"] * len(band_keys)),
+                [value for band_key in band_keys for value in band_key]))
+            for key, other in candidates.items():
+                score = jaccard(shingle_set, cached_shingles(other, self.ngram))
+                if score >= threshold and score > hits.get(key, 0.0):
+                    hits[key] = score
+        return sorted(hits.items(), key=lambda item: item[1], reverse=True)
+
+    def link_all(self, threshold: Optional[float] = None) -> pd.DataFrame:
+        """Cluster every indexed record with its near duplicates (union-find over query hits)."""
+        records = self.conn.execute("SELECT key, name, website, grp FROM records ORDER BY id").fetchall()
+        parent = {key: key for key, _, _, _ in records}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for key, name, website, _ in records:
+            for other, _ in self.query(name, website, threshold):
+                root_a, root_b = find(key), find(other)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        rows = [{"Key": key, "Cluster": find(key), "Victim Name": name, "Website": website, "Group": group}
+                for key, name, website, group in records]
+        df = pd.DataFrame(rows, columns=["Key", "Cluster", "Victim Name", "Website", "Group"])
+        df["Cluster Size"] = df.groupby("Cluster")["Key"].transform("size")
+        return df.sort_values(["Cluster", "Key"])
+
+
+def record_key(group: str, name: str) -> str:
+    """Stable index key for a victim of a group."""
+    return f"{group}:{normalize_name(name) or name}"
+
+
+def update_match_index(df: pd.DataFrame, path: str = MATCH_INDEX_FILE) -> int:
+    """Incrementally add a run's records to the persisted index; returns the number added."""
+    try:
+        index = MatchIndex(path)
+        try:
+            return index.insert_frame(df)
+        finally:
+            index.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error updating match index {path}: {e}")
+        return 0
+
+
+def read_victim_file(path: str) -> pd.DataFrame:
+    """Read a scraper output file (xlsx or csv)."""
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path, engine="openpyxl")
+    return pd.read_csv(path)
+
+
+def main():
+    """Add scraper outputs to the index or link everything into clusters."""
+    ap = argparse.ArgumentParser(description="Cross-group victim matching index.")
+    ap.add_argument("command", choices=["add", "link"], help="add: insert files into the index, link: cluster all records")
+    ap.add_argument("files", nargs="*", help="Scraper output files (xlsx/csv) with 'Victim Name' and 'Group' columns")
+    ap.add_argument("--index", default=MATCH_INDEX_FILE, help="Index database")
+    ap.add_argument("--threshold", type=float, default=None, help="Minimum n-gram Jaccard similarity for a match")
+    ap.add_argument("--out", default="victim_links.csv", help="Output CSV for link")
+    args = ap.parse_args()
+
+    index = MatchIndex(args.index)
+    for path in args.files:
+        try:
+            added = index.insert_frame(read_victim_file(path))
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            sys.exit(1)
+        print(f"{path}: {added} new records")
+    print(f"Index holds {len(index)} records")
+
+    if args.command == "link":
+        links = index.link_all(args.threshold)
+        links.to_csv(args.out, index=False)
+        duplicates = links[links["Cluster Size"] > 1]
+        print(f"{duplicates['Cluster'].nunique()} clusters with near duplicates ({len(duplicates)} records) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+normalize.py
+Batch normalization of scraped victim records into one typed schema.
+
+All groups' date strings are parsed in a handful of vectorized
+pd.to_datetime passes (one per known format) instead of per-row
+strptime calls, so sorting, year filters and time-window queries run on
+native datetime64 columns.
+"""
+
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+from records import RecordBatch
+
+# Output schema shared by every group: column -> pandas dtype
+SCHEMA = {
+    'Victim Name': 'string',
+    'Group': 'category',
+    'Type': 'string',
+    'Description': 'string',
+    'Website': 'string',
+    'Post URL': 'string',
+    'Date': 'datetime64[ns]',
+    'Published': 'datetime64[ns]',
+    'Scraped Date': 'datetime64[ns]',
+}
+
+DATE_COLUMNS = [column for column, dtype in SCHEMA.items() if dtype.startswith('datetime')]
+
+# Group specific column names mapped onto the shared schema
+COLUMN_ALIASES = {
+    'Added Date': 'Date',            # play
+    'Publication Date': 'Published',  # play
+}
+
+# Date formats seen across the leak sites, tried in order on whatever is still unparsed
+DATE_FORMATS = [
+    '%Y-%m-%d',                 # akira, play
+    '%b %d, %Y',                # qilin ("Jan 05, 2025")
+    '%B %d, %Y',                # qilin, long month names
+    '%Y-%m-%d %H:%M:%S',        # Scraped Date
+    '%Y-%m-%d %H:%M:%S.%f',     # ransomware.live style published dates
+    '%Y-%m-%dT%H:%M:%S',
+    '%d.%m.%Y',
+]
+
+
+def parse_dates(values: Union[pd.Series, Iterable[str]], label: str = 'Date') -> pd.Series:
+    """Parse a batch of date strings into a datetime64 Series (NaT where nothing matched)."""
+    values = pd.Series(values, dtype='object')
+    text = values.fillna('').astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    pending = text != ''
+    for fmt in DATE_FORMATS:
+        if not pending.any():
+            break
+        attempt = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+        hit = attempt.notna()
+        parsed.loc[attempt.index[hit]] = attempt[hit]
+        pending.loc[attempt.index[hit]] = False
+    if pending.any():
+        # Non-empty dates no format matched; a growing count means a site changed its format
+        print(f"[WARN] {int(pending.sum())} of {len(text)} {label} values matched no known format "
+              f"(e.g. {text[pending].iloc[0]!r})")
+    return parsed
+
+
+def normalize_records(records: Union[List[Dict], RecordBatch, pd.DataFrame]) -> pd.DataFrame:
+    """Convert raw scraper rows into a DataFrame following SCHEMA.
+
+    Columns outside the schema (e.g. Play detail page fields) are kept after
+    the schema columns.
+    """
+    if isinstance(records, RecordBatch):
+        df = records.to_frame()
+    elif isinstance(records, pd.DataFrame):
+        df = records.copy()
+    else:
+        df = pd.DataFrame(list(records))
+    for alias, column in COLUMN_ALIASES.items():
+        if alias in df.columns:
+            if column in df.columns:
+                df[column] = df[column].where(df[column].notna() & (df[column] != ''), df[alias])
+            else:
+                df[column] = df[alias]
+            df = df.drop(columns=alias)
+
+    for column, dtype in SCHEMA.items():
+        if column not in df.columns:
+            df[column] = pd.NaT if column in DATE_COLUMNS else None
+        if column in DATE_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = parse_dates(df[column], column)
+        else:
+            df[column] = df[column].astype(dtype)
+
+    extras = [column for column in df.columns if column not in SCHEMA]
+    return df[list(SCHEMA) + extras]
+
+
+def select_window(df: pd.DataFrame, start: Optional[str] = None, end: Optional[str] = None,
+                  column: str = 'Date') -> pd.DataFrame:
+    """Return the rows whose ``column`` falls in [start, end)."""
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df[column] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df[column] < pd.Timestamp(end)
+    return df[mask]
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+onion_sim.py
+Local stand-in for Tor and the akira/play/qilin leak sites.
+
+A SOCKS5 proxy (socks5h, so .onion names are resolved by the proxy)
+forwards every CONNECT to one local HTTP server that serves fake akira,
+play and qilin sites depending on the Host header. Faults are injected
+on the way:
+
+  * circuit build latency on every new SOCKS connection
+  * per-request latency drawn from a configurable distribution
+  * bursts of 400 responses carrying a captcha page
+  * dropped connections (socket closed without a response)
+  * slow bodies (the response is trickled out in small chunks)
+
+Only plain HTTP is served, so akira's https:// URLs have to be pointed at
+http:// while simulating (loadtest.py does this).
+
+Usage:
+    python onion_sim.py --socks-port 19150 --latency lognormal:0.0,0.6 --drop 0.02 --captcha-burst 0.01,5
+"""
+
+import argparse
+import json
+import math
+import random
+import select
+import socket
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler from 'fixed:S', 'uniform:A,B', 'exp:MEAN', 'lognormal:MU,SIGMA' or 'pareto:SCALE,ALPHA' (seconds)."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    if kind == "pareto":
+        return lambda rng: values[0] * rng.paretovariate(values[1])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class FaultConfig:
+    """What to inject and how often."""
+
+    def __init__(self, latency: str = "fixed:0", circuit_latency: str = "fixed:0", drop: float = 0.0,
+                 captcha_burst: Tuple[float, int] = (0.0, 0), slow_body: float = 0.0,
+                 slow_chunk_delay: float = 0.2, seed: Optional[int] = None):
+        self.latency = parse_distribution(latency)
+        self.circuit_latency = parse_distribution(circuit_latency)
+        self.drop = drop
+        self.burst_probability, self.burst_length = captcha_burst
+        self.slow_body = slow_body
+        self.slow_chunk_delay = slow_chunk_delay
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.bursts: Dict[str, int] = {}
+        self.stats = {"requests": 0, "dropped": 0, "captcha": 0, "slow": 0, "socks": 0}
+
+    def sample(self, sampler: Callable[[random.Random], float]) -> float:
+        with self.lock:
+            return max(0.0, sampler(self.rng))
+
+    def roll(self, probability: float) -> bool:
+        with self.lock:
+            return probability > 0 and self.rng.random() < probability
+
+    def in_captcha_burst(self, host: str) -> bool:
+        """True while ``host`` is inside a 400/captcha burst (a new burst may start on any request)."""
+        with self.lock:
+            remaining = self.bursts.get(host, 0)
+            if remaining == 0 and self.burst_probability > 0 and self.rng.random() < self.burst_probability:
+                remaining = self.burst_length
+            if remaining:
+                self.bursts[host] = remaining - 1
+                return True
+            return False
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class FakeSites:
+    """Deterministic content for the three leak sites."""
+
+    def __init__(self, akira_pages: int = 5, per_page: int = 10, play_victims: int = 100,
+                 qilin_victims: int = 50, seed: int = 7):
+        self.akira_pages = akira_pages
+        self.per_page = per_page
+        self.play_victims = play_victims
+        self.qilin_victims = qilin_victims
+        self.seed = seed
+        self.csrf_token = "simcsrf" + str(seed)
+
+    def name(self, group: str, i: int) -> str:
+        return f"{group.title()} Victim {i:05d} {random.Random(f'{self.seed}{group}{i}').choice(['Inc', 'LLC', 'GmbH', 'Ltd'])}"
+
+    @staticmethod
+    def date(i: int) -> str:
+        return f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+
+    def route(self, host: str, path: str, headers) -> Tuple[int, str, bytes, Dict[str, str]]:
+        """(status, content type, body, extra headers) for a request."""
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        if "akira" in host:
+            return self.akira(url.path, query, headers)
+        if host.startswith("ijzn3"):
+            return self.qilin(url.path, query)
+        return self.play(url.path, query)
+
+    def akira(self, path, query, headers):
+        if path in ("/n", "/l"):
+            if headers.get("X-CSRF-Token") != self.csrf_token or "akira_session" not in headers.get("Cookie", ""):
+                return 419, "application/json", b'{"message": "CSRF token mismatch."}', {}
+            page = int(query.get("page", ["1"])[0])
+            objects = []
+            if page <= self.akira_pages:
+                for i in range((page - 1) * self.per_page, page * self.per_page):
+                    if path == "/n":
+                        objects.append({"title": self.name("akira", i), "content": f"News about victim {i}. " * 5,
+                                        "date": self.date(i)})
+                    else:
+                        objects.append({"name": self.name("akira", i), "desc": f"Leaked data of victim {i}.",
+                                        "date": self.date(i) if i % 3 else ""})
+            return 200, "application/json", json.dumps({"objects": objects}).encode(), {}
+        body = f'<html><head><meta name="csrf-token" content="{self.csrf_token}"></head><body>akira</body></html>'
+        return 200, "text/html", body.encode(), {"Set-Cookie": "akira_session=sim; Path=/"}
+
+    def play(self, path, query):
+        if path == "/topic.php":
+            topic = query.get("id", [""])[0]
+            body = (f'<table><th class="News">{topic}<div style="line-height: 1.70;">added: 2025-01-01 '
+                    f'publication date: 2025-01-08 amount of data: ~{len(topic) * 37} gb '
+                    f'information: Detail page of {topic}. comment: simulated</div></th></table>')
+            return 200, "text/html", body.encode(), {}
+        rows = []
+        for i in range(self.play_victims):
+            rows.append(f'<tr><th class="News" onclick="viewtopic(\'topic{i:05d}\')">{self.name("play", i)}'
+                        f'<i class="location"></i>Somewhere<i class="link"></i>victim{i}.com'
+                        f'<div style="line-height: 1.70;">added: {self.date(i)} publication date: {self.date(i + 7)}</div></th></tr>')
+        return 200, "text/html", ("<table>" + "".join(rows) + "</table>").encode(), {}
+
+    def qilin(self, path, query):
+        head = f'<html><head><meta name="csrf-token" content="{self.csrf_token}"></head><body>'
+        if path.startswith("/site/view"):
+            uuid = query.get("uuid", [""])[0]
+            body = (f'{head}<div class="item_box"><div class="col-md-8 col-xl-6">Information about {uuid}. '
+                    f'Revenue, employees and leaked files.<p>files</p></div></div></body></html>')
+            return 200, "text/html", body.encode(), {}
+        boxes = []
+        for i in range(self.qilin_victims):
+            boxes.append(f'<div class="item_box"><a class="item_box-title">{self.name("qilin", i)}</a>'
+                         f'<div class="item_box-info__item d-flex align-items-center">x</div>'
+                         f'<div class="item_box-info__item d-flex align-items-center">Jan {i % 28 + 1:02d}, 2025</div>'
+                         f'<a class="item_box-info__link" href="https://victim{i}.com">site</a>'
+                         f'<div class="item_box_text">Qilin victim {i} description.</div>'
+                         f'<a class="learn_more" href="/site/view?uuid={i:08d}">more</a></div>')
+        return 200, "text/html", (head + "".join(boxes) + "</body></html>").encode(), {}
+
+
+def make_http_handler(sites: FakeSites, faults: FaultConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            faults.count("requests")
+            host = self.headers.get("Host", "").split(":")[0]
+            if faults.roll(faults.drop):
+                faults.count("dropped")
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            time.sleep(faults.sample(faults.latency))
+            if faults.in_captcha_burst(host):
+                faults.count("captcha")
+                self.respond(400, "text/html", b"<html><body>Please solve the captcha to continue</body></html>", {})
+                return
+            self.respond(*sites.route(host, self.path, self.headers))
+
+        def respond(self, status, content_type, body, extra):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in extra.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if faults.roll(faults.slow_body):
+                faults.count("slow")
+                chunk = max(1, math.ceil(len(body) / 10))
+                for i in range(0, len(body), chunk):
+                    self.wfile.write(body[i:i + chunk])
+                    self.wfile.flush()
+                    time.sleep(faults.slow_chunk_delay)
+            else:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class Socks5Handler(socketserver.BaseRequestHandler):
+    """Minimal no-auth SOCKS5 CONNECT that forwards everything to the fake HTTP server."""
+
+    def recv_exact(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("client closed during handshake")
+            data += chunk
+        return data
+
+    def handle(self):
+        server = self.server
+        try:
+            version, nmethods = self.recv_exact(2)
+            self.recv_exact(nmethods)
+            self.request.sendall(b"\x05\x00")
+            version, cmd, _, atyp = self.recv_exact(4)
+            if atyp == 1:
+                self.recv_exact(4)
+            elif atyp == 3:
+                self.recv_exact(self.recv_exact(1)[0])
+            elif atyp == 4:
+                self.recv_exact(16)
+            self.recv_exact(2)
+            if cmd != 1:
+                self.request.sendall(b"\x05\x07\x00\x01" + b"\x00" * 6)
+                return
+            server.faults.count("socks")
+            time.sleep(server.faults.sample(server.faults.circuit_latency))
+            upstream = socket.create_connection(server.upstream)
+        except (ConnectionError, OSError, ValueError):
+            return
+        self.request.sendall(b"\x05\x00\x00\x01" + socket.inet_aton("127.0.0.1") + struct.pack(">H", server.upstream[1]))
+        self.pump(self.request, upstream)
+
+    @staticmethod
+    def pump(client: socket.socket, upstream: socket.socket):
+        sockets = [client, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(sockets, [], [], 60)
+                if not readable:
+                    return
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is client else client).sendall(data)
+        except OSError:
+            return
+        finally:
+            upstream.close()
+
+
+class Socks5Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, upstream, faults: FaultConfig):
+        self.upstream = upstream
+        self.faults = faults
+        super().__init__(address, Socks5Handler)
+
+
+class OnionSimulator:
+    """SOCKS5 proxy plus fake leak sites, running in background threads."""
+
+    def __init__(self, faults: FaultConfig, sites: Optional[FakeSites] = None, socks_port: int = 0, http_port: int = 0):
+        self.faults = faults
+        self.sites = sites or FakeSites()
+        self.http = ThreadingHTTPServer(("127.0.0.1", http_port), make_http_handler(self.sites, faults))
+        self.http.daemon_threads = True
+        self.socks = Socks5Server(("127.0.0.1", socks_port), self.http.server_address, faults)
+        self.threads = []
+
+    @property
+    def socks_port(self) -> int:
+        return self.socks.server_address[1]
+
+    def start(self) -> "OnionSimulator":
+        for server in (self.http, self.socks):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in (self.socks, self.http):
+            server.shutdown()
+            server.server_close()
+
+
+def add_fault_arguments(ap: argparse.ArgumentParser):
+    """CLI options shared by the simulator and the load-test driver."""
+    ap.add_argument("--latency", default="lognormal:-1.0,0.5", help="Per-request latency distribution (seconds)")
+    ap.add_argument("--circuit-latency", default="fixed:0", help="Latency added to every new SOCKS connection")
+    ap.add_argument("--drop", type=float, default=0.0, help="Probability of dropping a request's connection")
+    ap.add_argument("--captcha-burst", default="0,0", help="PROBABILITY,LENGTH of 400/captcha bursts per host")
+    ap.add_argument("--slow-body", type=float, default=0.0, help="Probability of trickling a response body")
+    ap.add_argument("--slow-chunk-delay", type=float, default=0.2, help="Delay between the 10 chunks of a slow body")
+    ap.add_argument("--seed", type=int, default=None, help="Random seed for fault injection")
+
+
+def faults_from_args(args) -> FaultConfig:
+    probability, length = args.captcha_burst.split(",")
+    return FaultConfig(args.latency, args.circuit_latency, args.drop, (float(probability), int(length)),
+                       args.slow_body, args.slow_chunk_delay, args.seed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local SOCKS5 proxy and fake leak sites with fault injection.")
+    ap.add_argument("--socks-port", type=int, default=19150, help="SOCKS5 port to listen on")
+    add_fault_arguments(ap)
+    args = ap.parse_args()
+
+    sim = OnionSimulator(faults_from_args(args), socks_port=args.socks_port).start()
+    print(f"SOCKS5 proxy on 127.0.0.1:{sim.socks_port} (use --socks-port {sim.socks_port}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"stats: {sim.faults.stats}")
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
+import argparse
+import json
+import os
+import threading
 import requests
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qs, urlsplit
 from bs4 import BeautifulSoup
 from datetime import datetime
-import time
+from rate_control import AIMDRateController
+from normalize import normalize_records
+from records import RecordBatch
+from matching import update_match_index
+from search_index import update_search_index
+from profiling import stage
+import profiling
 
 # Configuration
 PLAY_MAIN_URL = "http://k7kg3jqxang3wh7hnmaiokchk7qoebupfgoik6rha6mjpzwupwtj25yd.onion"
 
+# List of known Play mirrors
+MIRROR_URLS = [
+    "http://k7kg3jqxang3wh7hnmaiokchk7qoebupfgoik6rha6mjpzwupwtj25yd.onion",
+    "http://mbrlkbtq5jonaqkurjwmxftytyn2ethqvbxfu4rgjbkkknndqwae6byd.onion",
+    "http://j75o7xvvsm4lpsjhkjvb4wl2q6ajegvabe6oswthuaubbykk4xkzgpid.onion"
+]
+
 PROXIES = {
     'http': 'socks5h://127.0.0.1:9150',
     'https': 'socks5h://127.0.0.1:9150'
@@ -14,6 +32,25 @@ PROXIES = {
 
 OUTPUT_FILE = f"play_victims_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
+# Adaptive per-host pacing (replaces the fixed sleep between mirrors)
+rate_controller = AIMDRateController()
+
+# Detail page enrichment: topic id -> extracted fields, kept across runs
+ENRICHED_TOPICS_FILE = "play_enriched_topics.json"
+ENRICH_WORKERS = 8
+
+# Labels on a topic.php page and the record fields they fill (None = boundary only)
+TOPIC_LABELS = {
+    'amount of data:': 'Leak Size',
+    'information:': 'Information',
+    'comment:': 'Comment',
+    'added:': None,
+    'publication date:': None,
+    'download links:': None,
+    'password:': None,
+    'views:': None,
+}
+
 def test_connection():
     """Test if Tor connection is working"""
     try:
@@ -34,35 +71,22 @@ def test_connection():
         print(f"✗ Connection test failed: {e}")
         return False
 
-def scrape_play_main_page(base_url):
-    """Scrape the main Play ransomware leak site"""
-    print(f"\nConnecting to: {base_url}")
-    
-    try:
-        response = requests.get(
-            base_url,
-            proxies=PROXIES,
-            timeout=90
-        )
-        
-        if response.status_code != 200:
-            print(f"✗ Failed to connect (Status: {response.status_code})")
-            return []
-        
-        print("✓ Connected successfully!")
+def parse_play_page(content, base_url, scraped=None):
+    """Extract victim records from a Play listing page (live or archived) as a RecordBatch scraped at ``scraped``"""
+    with stage("parse"):
+        soup = BeautifulSoup(content, 'html.parser')
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+    # Find all victim entries
+    victim_entries = soup.find_all('th', {'class': 'News'})
         
-        # Find all victim entries
-        victim_entries = soup.find_all('th', {'class': 'News'})
-        
-        if not victim_entries:
-            print("✗ No victim entries found on the page")
-            return []
+    if not victim_entries:
+        print("✗ No victim entries found on the page")
+        return []
         
-        print(f"✓ Found {len(victim_entries)} victim entries\n")
+    print(f"✓ Found {len(victim_entries)} victim entries\n")
         
-        all_victims = []
+    with stage("extract"):
+        all_victims = RecordBatch('play', scraped)
         
         for idx, entry in enumerate(victim_entries, 1):
             try:
@@ -115,18 +139,8 @@ def scrape_play_main_page(base_url):
                         except:
                             pass
                 
-                victim_data = {
-                    'Victim Name': title,
-                    'Description': description,
-                    'Website': website,
-                    'Added Date': added_date,
-                    'Publication Date': published_date,
-                    'Post URL': post_url,
-                    'Group': 'play',
-                    'Scraped Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                all_victims.append(victim_data)
+                all_victims.append(title, description, website, date=added_date,
+                                   published=published_date, post_url=post_url)
                 
                 print(f"[{idx}/{len(victim_entries)}] ✓ {title}")
                 
@@ -134,57 +148,213 @@ def scrape_play_main_page(base_url):
                 print(f"[{idx}/{len(victim_entries)}] ✗ Error: {str(e)}")
                 continue
         
-        return all_victims
+    return all_victims
+
+def scrape_play_main_page(base_url, session=None, scraped=None):
+    """Scrape the main Play ransomware leak site (optionally over a pooled session)"""
+    print(f"\nConnecting to: {base_url}")
+    
+    try:
+        rate_controller.wait(base_url)
+        with stage("fetch"):
+            response = (session or requests).get(
+                base_url,
+                proxies=PROXIES,
+                timeout=90
+            )
+        rate_controller.record(base_url, response.status_code, response.elapsed.total_seconds())
+        
+        if response.status_code != 200:
+            print(f"✗ Failed to connect (Status: {response.status_code})")
+            return []
+        
+        print("✓ Connected successfully!")
+        
+        return parse_play_page(response.content, base_url, scraped)
         
     except requests.exceptions.Timeout:
+        rate_controller.record(base_url, error=True)
         print("✗ Connection timeout")
         return []
     except requests.exceptions.ConnectionError:
+        rate_controller.record(base_url, error=True)
         print("✗ Connection error - check Tor is running")
         return []
     except Exception as e:
         print(f"✗ Error: {str(e)}")
         return []
 
-def try_multiple_urls(urls):
+def topic_id_from_url(post_url):
+    """Return the topic id of a topic.php post URL ('' if there is none)"""
+    return parse_qs(urlsplit(post_url).query).get('id', [''])[0]
+
+def parse_topic_page(content):
+    """Extract the labelled fields (leak size, information, comment) from a topic.php page"""
+    soup = BeautifulSoup(content, 'html.parser')
+    entry = soup.find('th', {'class': 'News'}) or soup
+    text = ' '.join(entry.get_text(' ').split())
+    lower = text.lower()
+
+    # Every label starts a value that runs until the next label
+    positions = sorted((lower.find(label), label) for label in TOPIC_LABELS if label in lower)
+    fields = {}
+    for i, (start, label) in enumerate(positions):
+        end = positions[i + 1][0] if i + 1 < len(positions) else len(text)
+        field = TOPIC_LABELS[label]
+        if field:
+            fields[field] = text[start + len(label):end].strip()
+    return fields
+
+_thread_local = threading.local()
+
+def _topic_session():
+    """One pooled session per worker thread"""
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+        _thread_local.session.proxies.update(PROXIES)
+    return _thread_local.session
+
+def fetch_topic(post_url):
+    """Fetch and parse one topic.php page; returns None on failure"""
+    try:
+        rate_controller.wait(post_url)
+        response = _topic_session().get(post_url, proxies=PROXIES, timeout=90)
+        rate_controller.record(post_url, response.status_code, response.elapsed.total_seconds())
+        if response.status_code != 200:
+            return None
+        return parse_topic_page(response.content)
+    except requests.exceptions.RequestException:
+        rate_controller.record(post_url, error=True)
+        return None
+    except Exception as e:
+        # A malformed page must not take the other topics down with it
+        print(f"✗ Could not parse {post_url}: {e}")
+        return None
+
+def load_enriched_topics(path=ENRICHED_TOPICS_FILE):
+    """Load the topic id -> fields store"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"✗ Could not read {path}: {e}")
+        return {}
+
+def save_enriched_topics(topics, path=ENRICHED_TOPICS_FILE):
+    """Write the topic id -> fields store atomically"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(topics, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def enrich_victims(victims, workers=ENRICH_WORKERS, path=ENRICHED_TOPICS_FILE):
+    """
+    Fetch topic.php detail pages concurrently and merge their fields into the
+    victim records. Topics already enriched in an earlier run are not fetched again.
+    """
+    topics = load_enriched_topics(path)
+    topic_ids = [topic_id_from_url(url) for url in victims.column('Post URL')]
+    pending = {}
+    for topic_id, url in zip(topic_ids, victims.column('Post URL')):
+        if topic_id and topic_id not in topics:
+            pending[topic_id] = url
+
+    print(f"\nEnriching {len(pending)} topics ({len(topics)} already known) with {workers} workers...")
+    done = 0
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(fetch_topic, url): topic_id for topic_id, url in pending.items()}
+        for future in as_completed(futures):
+            topic_id = futures[future]
+            fields = future.result()
+            done += 1
+            if fields is None:
+                print(f"[{done}/{len(pending)}] ✗ {topic_id}")
+                continue
+            topics[topic_id] = fields
+            print(f"[{done}/{len(pending)}] ✓ {topic_id}")
+    finally:
+        # On an interrupt, skip the topics not started yet and keep what was fetched
+        pool.shutdown(cancel_futures=True)
+        if pending:
+            save_enriched_topics(topics, path)
+
+    for field in [field for field in TOPIC_LABELS.values() if field]:
+        victims.set_column(field, [topics.get(topic_id, {}).get(field, '') for topic_id in topic_ids])
+    return victims
+
+def try_multiple_urls(urls, scraped=None):
     """Try multiple mirror URLs until one works"""
     for url in urls:
         print(f"\nAttempting: {url}")
-        victims = scrape_play_main_page(url)
+        victims = scrape_play_main_page(url, scraped=scraped)
         if victims:
             return victims
         print("Trying next URL...\n")
-        time.sleep(3)
     return []
 
-def save_to_excel(data, filename):
-    """Save data to Excel"""
+def save_to_excel(data, filename, update_indexes=True):
+    """Save data to Excel; update_indexes=False leaves the match and search indexes alone"""
     if not data:
         print("\n✗ No data to save!")
         return
     
-    df = pd.DataFrame(data)
-    
-    # Remove duplicates based on victim name
-    df = df.drop_duplicates(subset=['Victim Name'], keep='first')
-    
-    # Sort by added date if available
-    if 'Added Date' in df.columns:
-        df = df.sort_values('Added Date', ascending=False)
-    
-    df.to_excel(filename, index=False, engine='openpyxl')
+    with stage("write"):
+        # Parse "added:" / "publication date:" into typed datetime columns
+        df = normalize_records(data)
+        
+        # Remove duplicates based on victim name
+        df = df.drop_duplicates(subset=['Victim Name'], keep='first')
+        
+        # Sort by added date
+        df = df.sort_values('Date', ascending=False)
+        
+        df.to_excel(filename, index=False, engine='openpyxl')
+
+        # Make this run's victims available for cross-group matching
+        if update_indexes:
+            matched = update_match_index(df)
+            indexed = update_search_index(df)
     
     print(f"\n{'='*60}")
     print(f"✓ SUCCESS!")
     print(f"{'='*60}")
     print(f"Total victims collected: {len(df)}")
     print(f"File saved: {filename}")
+    if update_indexes:
+        print(f"New records in match index: {matched}")
+        print(f"Rows updated in search index: {indexed}")
+    else:
+        print("Match and search indexes not updated (offline run)")
     print(f"{'='*60}\n")
 
 def main():
+    ap = argparse.ArgumentParser(description="Scrape the Play ransomware leak site.")
+    ap.add_argument("--profile", action="store_true", help="Profile each stage and write a .prof file plus a hotspot summary")
+    ap.add_argument("--profile-top", type=int, default=20, help="Number of hotspots in the profile summary")
+    ap.add_argument("--fixture", help="Parse an archived listing page from this file instead of the site")
+    ap.add_argument("--enrich", action="store_true", help="Fetch topic.php detail pages and add leak size, information and comment")
+    ap.add_argument("--workers", type=int, default=ENRICH_WORKERS, help="Concurrent detail page fetches for --enrich")
+    args = ap.parse_args()
+
+    if args.profile:
+        profiling.enable("play", args.profile_top)
+
     print("=" * 60)
     print("Play Ransomware Direct Site Scraper")
     print("=" * 60)
+
+    scraped = datetime.now()  # Scraped Date of every record from this run
+
+    if args.fixture:
+        with open(args.fixture, 'rb') as f:
+            victims = parse_play_page(f.read(), PLAY_MAIN_URL, scraped)
+        if victims:
+            # Archived fixtures must not end up in the persistent indexes
+            save_to_excel(victims, OUTPUT_FILE, update_indexes=False)
+        return
     
     # Test Tor connection
     if not test_connection():
@@ -194,17 +364,16 @@ def main():
         if response.lower() != 'y':
             return
     
-    # List of known Play mirrors
-    mirror_urls = [
-        "http://k7kg3jqxang3wh7hnmaiokchk7qoebupfgoik6rha6mjpzwupwtj25yd.onion",
-        "http://mbrlkbtq5jonaqkurjwmxftytyn2ethqvbxfu4rgjbkkknndqwae6byd.onion",
-        "http://j75o7xvvsm4lpsjhkjvb4wl2q6ajegvabe6oswthuaubbykk4xkzgpid.onion"
-    ]
-    
     # Try scraping from available mirrors
     print("\nStarting scrape...")
-    victims = try_multiple_urls(mirror_urls)
+    victims = try_multiple_urls(MIRROR_URLS, scraped)
+
+    if victims and args.enrich:
+        with stage("fetch"):
+            enrich_victims(victims, args.workers)
     
+    rate_controller.report()
+
     # Save results
     if victims:
         save_to_excel(victims, OUTPUT_FILE)
@@ -217,4 +386,8 @@ def main():
         print("  - Connection blocked")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Write the profile even when the run is aborted or fails
+        profiling.finish()
\ No newline at end of file
@@ -1,5 +1,3 @@
-Scraper
-
 #!/usr/bin/env python3
 """
 onion_bulk_scraper.py
@@ -8,17 +6,27 @@ Outputs CSV with columns: url, description. Saves every 20 successful entries.
 
 Usage:
     python onion_bulk_scraper.py urls.txt results.csv
+    python onion_bulk_scraper.py urls.txt results.csv --queue /shared/urls.queue   (on every node)
+    python work_queue.py export /shared/urls.queue results.csv                    (results so far)
+
+With --queue, only the worker that finds the queue drained writes results.csv.
 """
 
 import sys
 import time
 import csv
+import os
 import argparse
 from typing import Optional, List, Dict
 import requests
 from bs4 import BeautifulSoup
 from stem import Signal
 from stem.control import Controller
+from rate_control import AIMDRateController
+from search_index import update_search_index_urls
+from work_queue import WorkQueue, process_queue
+from profiling import stage
+import profiling
 
 def clean(s: Optional[str]) -> str:
     """Clean text by removing extra whitespace and ensuring it's a string."""
@@ -83,23 +91,32 @@ def make_session(socks_host: str, socks_port: int) -> requests.Session:
     })
     return session
 
-def fetch(session: requests.Session, url: str, retries: int = 3, control_port: int = 9051) -> Optional[str]:
-    """Fetch HTML content from a URL with retries and Tor IP renewal."""
+def fetch(session: requests.Session, url: str, retries: int = 3, control_port: int = 9051,
+          controller: Optional[AIMDRateController] = None) -> Optional[str]:
+    """Fetch HTML content from a URL with adaptive pacing, jittered retries and Tor IP renewal."""
+    controller = controller or AIMDRateController()
     for attempt in range(1, retries + 1):
         try:
             if hasattr(session, 'csrf_token') and session.csrf_token:
                 session.headers.update({"X-CSRF-Token": session.csrf_token})
 
-            r = session.get(url, timeout=30)
+            controller.wait(url)
+            with stage("fetch"):
+                r = session.get(url, timeout=30)
+            captcha = r.status_code == 400 and "captcha" in r.text.lower()
+            controller.record(url, r.status_code, r.elapsed.total_seconds(), captcha=captcha)
             r.raise_for_status()
-            r.encoding = r.apparent_encoding or r.encoding
+            with stage("decode"):
+                r.encoding = r.apparent_encoding or r.encoding
+                text = r.text
 
-            csrf_token = extract_csrf_token(r.text)
+            with stage("parse"):
+                csrf_token = extract_csrf_token(text)
             if csrf_token:
                 session.csrf_token = csrf_token
                 print(f"Extracted CSRF token: {csrf_token[:20]}...")
 
-            return r.text
+            return text
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 400:
                 print(f"[{attempt}/{retries}] 400 Bad Request for {url}: {e.response.text[:200]}...")
@@ -111,25 +128,69 @@ def fetch(session: requests.Session, url: str, retries: int = 3, control_port: i
                     renew_tor_ip(control_port)
             else:
                 print(f"[{attempt}/{retries}] Failed {url}: {e}")
-            time.sleep(attempt * 3)  # Increased exponential backoff
+            controller.backoff(url, attempt)
         except Exception as e:
+            controller.record(url, error=True)
             print(f"[{attempt}/{retries}] Failed {url}: {e}")
-            time.sleep(attempt * 3)
+            controller.backoff(url, attempt)
     return None
 
+def read_fixture(path: str) -> Optional[str]:
+    """Read an archived HTML page from disk (offline mode)."""
+    try:
+        with stage("decode"):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+    except OSError as e:
+        print(f"Failed to read {path}: {e}")
+        return None
+
 def save_to_csv(rows: List[Dict[str, str]], out_csv: str, append: bool = True):
     """Save rows to CSV file in append mode."""
     try:
-        mode = 'a' if append and os.path.exists(out_csv) else 'w'
-        with open(out_csv, mode, newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["url", "description"])
-            if mode == 'w':
-                writer.writeheader()
-            writer.writerows(rows)
-        print(f"Saved {len(rows)} rows to {out_csv}")
+        with stage("write"):
+            mode = 'a' if append and os.path.exists(out_csv) else 'w'
+            # A full rewrite goes through a temp file so readers never see it half written
+            path = out_csv if mode == 'a' else out_csv + ".tmp"
+            with open(path, mode, newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=["url", "description"])
+                if mode == 'w':
+                    writer.writeheader()
+                writer.writerows(rows)
+            if path != out_csv:
+                os.replace(path, out_csv)
+            print(f"Saved {len(rows)} rows to {out_csv}")
+            update_search_index_urls(rows, "play")
     except Exception as e:
         print(f"Error writing to {out_csv}: {e}")
 
+def scrape_queue(args, urls: List[str], controller: AIMDRateController) -> Optional[List[Dict[str, str]]]:
+    """Scrape URLs claimed from a shared work queue until it is drained; see work_queue.process_queue."""
+    session = None
+
+    def start_batch():
+        nonlocal session
+        if not args.offline:
+            session = make_session(args.socks_host, args.socks_port)
+            renew_tor_ip(args.control_port)
+
+    def fetch_page(url: str) -> Optional[str]:
+        if args.offline:
+            return read_fixture(url)
+        return fetch(session, url, retries=3, control_port=args.control_port, controller=controller)
+
+    def describe(html: str) -> str:
+        with stage("parse"):
+            soup = BeautifulSoup(html, "lxml")
+        with stage("extract"):
+            return extract_information(soup)
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease, max_attempts=args.max_attempts)
+    try:
+        return process_queue(queue, urls, args.batch_size, fetch_page, describe, start_batch)
+    finally:
+        queue.close()
+
 def main():
     """Main function to scrape .onion URLs in batches and save to CSV."""
     ap = argparse.ArgumentParser(description="Scrape .onion pages for information paragraph and output to CSV.")
@@ -138,11 +199,20 @@ def main():
     ap.add_argument("--socks-host", default="127.0.0.1", help="Tor SOCKS host")
     ap.add_argument("--socks-port", type=int, default=9150, help="Tor SOCKS port (9050 for system Tor, 9150 for Tor Browser)")
     ap.add_argument("--control-port", type=int, default=9051, help="Tor control port for IP renewal")
-    ap.add_argument("--delay", type=float, default=3.0, help="Delay between requests in seconds")
+    ap.add_argument("--delay", type=float, default=3.0, help="Initial delay between requests in seconds (adapted per host at runtime)")
     ap.add_argument("--batch-size", type=int, default=20, help="Number of URLs per session batch")
     ap.add_argument("--save-every", type=int, default=20, help="Save to CSV after this many successful entries")
+    ap.add_argument("--offline", action="store_true", help="Treat urls_file entries as paths to archived HTML pages instead of fetching them")
+    ap.add_argument("--queue", help="Shared work-queue database; urls_file is merged into it and the URLs are split between every worker using it")
+    ap.add_argument("--lease", type=float, default=300.0, help="Seconds a claimed URL stays reserved for this worker without progress (--queue)")
+    ap.add_argument("--max-attempts", type=int, default=5, help="Attempts per URL across all workers before it is marked failed (--queue)")
+    ap.add_argument("--profile", action="store_true", help="Profile each stage and write a .prof file plus a hotspot summary")
+    ap.add_argument("--profile-top", type=int, default=20, help="Number of hotspots in the profile summary")
     args = ap.parse_args()
 
+    if args.profile:
+        profiling.enable(os.path.splitext(os.path.basename(__file__))[0], args.profile_top)
+
     # Read URLs from file
     try:
         with open(args.urls_file, "r", encoding="utf-8") as f:
@@ -151,6 +221,20 @@ def main():
         print(f"Error: {args.urls_file} not found.")
         sys.exit(1)
 
+    controller = AIMDRateController(initial_rate=1.0 / args.delay if args.delay > 0 else 1.0)
+
+    if args.queue:
+        rows = scrape_queue(args, urls, controller)
+        controller.report()
+        if rows is None:
+            # Only the worker that drained the queue writes the CSV and the search index
+            print(f"Done. Results are written by the worker that drained the queue; "
+                  f"to collect them here run: python work_queue.py export {args.queue} {args.out_csv}")
+        else:
+            save_to_csv(rows, args.out_csv, append=False)
+            print(f"Done. {len(rows)} rows written to {args.out_csv}")
+        return
+
     # Process URLs in batches
     batch_size = args.batch_size
     all_rows = []
@@ -160,20 +244,26 @@ def main():
         batch_urls = urls[batch_start:batch_start + batch_size]
         print(f"\nProcessing batch {batch_start // batch_size + 1} ({len(batch_urls)} URLs)")
        
-        # Create new session for each batch
-        session = make_session(args.socks_host, args.socks_port)
         batch_rows = []
-        renew_tor_ip(args.control_port)  # New circuit for each batch
+        # Create new session and circuit for each batch
+        if not args.offline:
+            session = make_session(args.socks_host, args.socks_port)
+            renew_tor_ip(args.control_port)
 
         for i, url in enumerate(batch_urls, batch_start + 1):
             print(f"[{i}/{len(urls)}] {url}")
-            html = fetch(session, url, retries=3, control_port=args.control_port)
+            if args.offline:
+                html = read_fixture(url)
+            else:
+                html = fetch(session, url, retries=3, control_port=args.control_port, controller=controller)
             if not html:
                 batch_rows.append({"url": url, "description": ""})
                 print(f"  -> No content fetched")
             else:
-                soup = BeautifulSoup(html, "lxml")
-                description = extract_information(soup)
+                with stage("parse"):
+                    soup = BeautifulSoup(html, "lxml")
+                with stage("extract"):
+                    description = extract_information(soup)
                 batch_rows.append({"url": url, "description": description})
                 print(f"  -> description: {description[:50]}... (len={len(description)})")
                 successful_count += 1
@@ -184,7 +274,6 @@ def main():
                 save_to_csv(batch_rows, args.out_csv, append=(batch_start > 0))
                 batch_rows = []  # Clear batch after saving
 
-            time.sleep(args.delay)
 
         # Save any remaining rows in the batch
         if batch_rows:
@@ -195,7 +284,12 @@ def main():
     if all_rows and len(all_rows) % args.save_every != 0:
         save_to_csv(all_rows[-len(batch_rows):], args.out_csv, append=True)
 
+    controller.report()
     print(f"Done. {len(all_rows)} rows written to {args.out_csv}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Write the profile even when the run is aborted or fails
+        profiling.finish()
\ No newline at end of file
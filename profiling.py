@@ -0,0 +1,146 @@
+"""
+profiling.py
+Opt-in per-stage CPU and memory profiling for the scrapers (--profile).
+
+Code marks its stages with ``with stage("fetch"):``. While profiling is
+off this is a no-op; once ``enable()`` has been called each stage gets its
+own cProfile profiler plus wall/CPU time and tracemalloc peak counters.
+``finish()`` writes a combined .prof file (readable with pstats or
+snakeviz) and a text report with the per-stage breakdown and top-N
+hotspots.
+
+Stages should not be nested; the inner stage is measured on its own and
+the outer profiler is paused meanwhile.
+"""
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class StageStats:
+    """Accumulated measurements of one stage."""
+
+    __slots__ = ("profile", "calls", "wall", "cpu", "peak_bytes", "alloc_bytes")
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_bytes = 0
+        self.alloc_bytes = 0
+
+
+class StageProfiler:
+    """Collects cProfile and tracemalloc data per named stage."""
+
+    def __init__(self, name: str = "run", top_n: int = 20):
+        self.name = name
+        self.top_n = top_n
+        self.enabled = False
+        self.stats: Dict[str, StageStats] = {}
+        self._stack: List[StageStats] = []
+
+    def start(self):
+        """Start collecting."""
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure the enclosed block as stage ``name``."""
+        if not self.enabled:
+            yield
+            return
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = StageStats()
+        if self._stack:
+            self._stack[-1].profile.disable()
+        self._stack.append(stats)
+
+        mem_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        stats.profile.enable()
+        try:
+            yield
+        finally:
+            stats.profile.disable()
+            stats.calls += 1
+            stats.wall += time.perf_counter() - wall
+            stats.cpu += time.process_time() - cpu
+            current, peak = tracemalloc.get_traced_memory()
+            stats.peak_bytes = max(stats.peak_bytes, peak - mem_before)
+            stats.alloc_bytes += max(0, current - mem_before)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].profile.enable()
+
+    def report(self) -> str:
+        """Per-stage breakdown followed by the top-N hotspots across all stages."""
+        out = io.StringIO()
+        out.write(f"Profile: {self.name}\n")
+        out.write(f"{'stage':<10}{'calls':>8}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'retained MB':>13}\n")
+        for name, stats in self.stats.items():
+            out.write(f"{name:<10}{stats.calls:>8}{stats.wall:>10.3f}{stats.cpu:>10.3f}"
+                      f"{stats.peak_bytes / 2**20:>10.2f}{stats.alloc_bytes / 2**20:>13.2f}\n")
+        combined = self._combined(out)
+        if combined is not None:
+            out.write(f"\nTop {self.top_n} hotspots (by internal time):\n")
+            combined.sort_stats(pstats.SortKey.TIME).print_stats(self.top_n)
+        return out.getvalue()
+
+    def _combined(self, stream) -> Optional[pstats.Stats]:
+        profiles = [stats.profile for stats in self.stats.values() if stats.calls]
+        if not profiles:
+            return None
+        combined = pstats.Stats(profiles[0], stream=stream)
+        for profile in profiles[1:]:
+            combined.add(profile)
+        return combined
+
+    def finish(self, path: Optional[str] = None) -> Optional[str]:
+        """Write ``<path>.prof`` and ``<path>.txt`` and print the summary. Returns the .prof path."""
+        if not self.enabled:
+            return None
+        path = path or f"{self.name}_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        summary = self.report()
+        combined = self._combined(io.StringIO())
+        if combined is not None:
+            combined.dump_stats(path + ".prof")
+        with open(path + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary)
+        print(summary)
+        print(f"Profile written to {path}.prof ({path}.txt)")
+        self.enabled = False
+        tracemalloc.stop()
+        return path + ".prof"
+
+
+# Process wide profiler used by the scraper scripts
+PROFILER = StageProfiler()
+
+
+def enable(name: str, top_n: int = 20):
+    """Turn on profiling for this process."""
+    PROFILER.name = name
+    PROFILER.top_n = top_n
+    PROFILER.start()
+
+
+def stage(name: str):
+    """Context manager marking a stage of the process wide profiler."""
+    return PROFILER.stage(name)
+
+
+def finish(path: Optional[str] = None) -> Optional[str]:
+    """Write the process wide profile if profiling is enabled."""
+    return PROFILER.finish(path)
@@ -1,6 +1,10 @@
-import os,datetime,sys,re
-from bs4 import BeautifulSoup
-from datetime import datetime
+import os,datetime,sys
+from normalize import normalize_records
+from matching import update_match_index
+from search_index import update_search_index
+from profiling import stage
+from qilin_snapshot import iter_batches
+import profiling
 from shared_utils import find_slug_by_md5, appender,extract_md5_from_filename, errlog
 from pathlib import Path
 from dotenv import load_dotenv
@@ -8,9 +12,15 @@ from dotenv import load_dotenv
 env_path = Path("../.env")
 load_dotenv(dotenv_path=env_path)
 home = os.getenv("RANSOMWARELIVE_HOME")
-tmp_dir = Path(home + os.getenv("TMP_DIR"))
+tmp_dir = Path(home + os.getenv("TMP_DIR")) if home else None
 
-def main():
+def main(stream=None):
+    # stream: True/False forces the streaming/tree parser, None picks by file size
+    if tmp_dir is None:
+        # Without it os.listdir(None) would parse whatever qilin-* files are in the cwd
+        sys.exit("qilin: RANSOMWARELIVE_HOME is not set; set it or pass --snapshots DIR")
+    # Scraped Date of every record from this run
+    scraped = datetime.datetime.now()
     # Define the date format to convert to
     date_format = "%Y-%m-%d %H:%M:%S.%f"
 
@@ -33,48 +43,50 @@ def main():
         try:
             if filename.startswith(group_name+'-'):
                 html_doc=tmp_dir / filename
-                file=open(html_doc,'r')
-                soup = BeautifulSoup(file, "html.parser")
-                ##divs_name = soup.find_all('div', {"class": "col-lg-4 col-sm-6 mb-4"})
-                # Loop through each item box and extract the required information
-                item_boxes = soup.find_all("div", class_="item_box")
-                for box in item_boxes:
-                    # Extract the victim name
-                    name_tag = box.find("a", class_="item_box-title")
-                    victim_name = name_tag.text.strip() 
-                    # Extract the date
-                    date_tags = box.find_all("div", class_="item_box-info__item d-flex align-items-center")
-                    if len(date_tags) > 1:
-                        raw_date = date_tags[1].text.strip()
-                        try:
-                            # Parse the date string
-                            parsed_date = datetime.strptime(raw_date, "%b %d, %Y")
-                            formatted_date = parsed_date.strftime(date_format)
-                        except ValueError:
-                            formatted_date = ""
-                    else:
-                        formatted_date = ""
-                    
-                    # Extract the URL
-                    url_tag = box.find("a", class_="item_box-info__link")
-                    url = url_tag['href'].strip() if url_tag else ""
-                    # Remove the protocols
-                    website = re.sub(r'^http[s]?://', '', url)
-  
-                    # Extract the description
-                    description_tag = box.find("div", class_="item_box_text")
-                    description = description_tag.text.strip() if description_tag else "N/A"
-                    
-                    # Extract the post URL
-                    post_url_tag = box.find("a", class_="learn_more")
-                    post_url = post_url_tag['href'].strip() 
-                    if post_url:
-                        site = find_slug_by_md5(group_name, extract_md5_from_filename(str(html_doc)))
-                        site = "http://ijzn3sicrcy7guixkzjkib4ukbiilwc3xhnmby4mcbccnsd7j2rekvqd.onion"
-                        post_url = site + post_url
-                    else:
-                        post_url = ""
-                    
-                    appender(victim_name, group_name, description,website,formatted_date,post_url)
+                site = find_slug_by_md5(group_name, extract_md5_from_filename(str(html_doc)))
+                site = "http://ijzn3sicrcy7guixkzjkib4ukbiilwc3xhnmby4mcbccnsd7j2rekvqd.onion"
+                # Victims are parsed, date-formatted and written a batch at a time
+                batches = iter_batches(html_doc, group_name, site, stream=stream, scraped=scraped)
+                matched = indexed = 0
+                while True:
+                    # Pulling a batch runs the parser's own decode/parse/extract stages
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    with stage("extract"):
+                        # Parse every date of the batch in one vectorized pass
+                        records = normalize_records(batch)
+                        formatted_dates = records['Date'].dt.strftime(date_format).fillna("")
+                    with stage("write"):
+                        for victim_name, description, website, post_url, formatted_date in zip(
+                                batch.column('Victim Name'), batch.column('Description'), batch.column('Website'),
+                                batch.column('Post URL'), formatted_dates):
+                            appender(victim_name, group_name, description,website,formatted_date,post_url)
+                        # Make the victims available for cross-group matching and search
+                        matched += update_match_index(records)
+                        indexed += update_search_index(records)
+                print(f"{filename}: {matched} new records in match index, {indexed} rows updated in search index")
         except Exception as e:
-            errlog(group_name + ' - parsing fail with error: ' + str(e) + ' in file:' + filename)
\ No newline at end of file
+            errlog(group_name + ' - parsing fail with error: ' + str(e) + ' in file:' + filename)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Parse archived qilin listing snapshots.")
+    ap.add_argument("--profile", action="store_true", help="Profile each stage and write a .prof file plus a hotspot summary")
+    ap.add_argument("--profile-top", type=int, default=20, help="Number of hotspots in the profile summary")
+    ap.add_argument("--snapshots", help="Directory of archived snapshots to parse instead of TMP_DIR")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--stream", dest="stream", action="store_true", default=None,
+                      help="Stream every snapshot one item_box at a time (constant memory)")
+    mode.add_argument("--no-stream", dest="stream", action="store_false",
+                      help="Always build a full tree (default streams files over 4 MB)")
+    args = ap.parse_args()
+    if args.snapshots:
+        tmp_dir = Path(args.snapshots)
+    if args.profile:
+        profiling.enable("qilin", args.profile_top)
+    try:
+        main(args.stream)
+    finally:
+        # Write the profile even when the run is aborted or fails
+        profiling.finish()
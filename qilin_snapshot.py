@@ -0,0 +1,205 @@
+"""
+qilin_snapshot.py
+Extract victims from archived qilin listing snapshots.
+
+Two parsers yield the same (victim, raw date, website, description, post
+path) tuples per item_box; iter_batches groups them into RecordBatches:
+
+  parse_boxes   builds a full BeautifulSoup tree (small files)
+  stream_boxes  feeds the file in chunks to an incremental HTMLParser that
+                keeps only the box being read, so peak memory is bounded
+                by one box rather than by the document
+
+Streaming uses the stdlib tokenizer (the one behind bs4's "html.parser")
+rather than lxml: libxml2's HTML push parser retains its whole input
+buffer, which defeats the point for multi-megabyte snapshots.
+"""
+
+import re
+from collections import deque
+from datetime import datetime
+from html.parser import HTMLParser
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup
+
+from profiling import stage
+from records import RecordBatch
+
+DATE_CLASS = "item_box-info__item d-flex align-items-center"
+
+# Characters read per feed() when streaming
+CHUNK_SIZE = 64 * 1024
+
+# Snapshots larger than this are streamed by default (bytes)
+STREAM_THRESHOLD = 4 * 2**20
+
+# Victims per RecordBatch from iter_batches
+BATCH_SIZE = 1000
+
+Box = Tuple[str, str, str, str, str]
+
+
+def _website(url: str) -> str:
+    # Remove the protocols
+    return re.sub(r'^http[s]?://', '', url)
+
+
+def parse_boxes(html_doc: Union[str, Path]) -> List[Box]:
+    """Every item_box of a snapshot, via a full BeautifulSoup tree."""
+    with stage("decode"):
+        with open(html_doc, 'r') as file:
+            html = file.read()
+    with stage("parse"):
+        soup = BeautifulSoup(html, "html.parser")
+    boxes = []
+    with stage("extract"):
+        for box in soup.find_all("div", class_="item_box"):
+            name_tag = box.find("a", class_="item_box-title")
+            date_tags = box.find_all("div", class_=DATE_CLASS)
+            url_tag = box.find("a", class_="item_box-info__link")
+            description_tag = box.find("div", class_="item_box_text")
+            post_url_tag = box.find("a", class_="learn_more")
+            boxes.append((
+                name_tag.text.strip(),
+                date_tags[1].text.strip() if len(date_tags) > 1 else "",
+                _website(url_tag['href'].strip() if url_tag else ""),
+                description_tag.text.strip() if description_tag else "N/A",
+                post_url_tag['href'].strip(),
+            ))
+    return boxes
+
+
+class BoxStreamParser(HTMLParser):
+    """
+    Incremental parser that keeps only the item_box currently being read.
+
+    Fields are captured with the same rules as parse_boxes (first match for
+    single fields, text of all descendants); completed boxes are queued in
+    self.boxes for the caller to drain after each feed().
+    """
+
+    # (tag, class, field) of the elements captured inside a box; a class
+    # containing spaces must match the whole attribute, as with bs4's class_
+    TARGETS = (
+        ("a", "item_box-title", "name"),
+        ("div", DATE_CLASS, "dates"),
+        ("a", "item_box-info__link", "url"),
+        ("div", "item_box_text", "description"),
+        ("a", "learn_more", "post"),
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.boxes = deque()
+        self.box = None
+        self.divs = 0  # open divs inside the current box, the box itself included
+        self.open = []  # [tag, depth, field, text parts] of captures still open
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in ("a", "div"):
+            return
+        attrs = dict(attrs)
+        classes = attrs.get("class") or ""
+        if self.box is None:
+            if tag == "div" and "item_box" in classes.split():
+                self.box = {"dates": []}
+                self.divs = 1
+            return
+        if tag == "div":
+            self.divs += 1
+        for target_tag, cls, field in self.TARGETS:
+            if tag != target_tag:
+                continue
+            matched = classes == cls if " " in cls else cls in classes.split()
+            if matched and (field == "dates" or field not in self.box):
+                if field != "dates":
+                    self.box[field] = None  # claimed; filled in when the element closes
+                if tag == "a":
+                    self.box[field + "_href"] = (attrs.get("href") or "").strip()
+                self.open.append([tag, self.divs, field, []])
+
+    def handle_endtag(self, tag):
+        if self.box is None or tag not in ("a", "div"):
+            return
+        for capture in reversed(self.open):
+            if capture[0] == tag and (tag == "a" or capture[1] == self.divs):
+                self.open.remove(capture)
+                text = "".join(capture[3]).strip()
+                if capture[2] == "dates":
+                    self.box["dates"].append(text)
+                else:
+                    self.box[capture[2]] = text
+                break
+        if tag == "div":
+            self.divs -= 1
+            if self.divs == 0:
+                self.boxes.append(self._fields(self.box))
+                self.box = None
+                self.open = []
+
+    def handle_data(self, data):
+        for capture in self.open:
+            capture[3].append(data)
+
+    @staticmethod
+    def _fields(box) -> Box:
+        if box.get("name") is None:
+            raise ValueError("item_box without a title")
+        if "post" not in box:
+            raise ValueError(f"item_box {box['name']!r} without a post link")
+        dates = box["dates"]
+        return (
+            box["name"],
+            dates[1] if len(dates) > 1 else "",
+            _website(box.get("url_href", "")),
+            (box["description"] or "") if "description" in box else "N/A",
+            box["post_href"],
+        )
+
+
+def stream_boxes(html_doc: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[Box]:
+    """Yield each item_box as soon as it closes; only the open box is held in memory."""
+    parser = BoxStreamParser()
+    # Stages are closed around each step, never across a yield, so the caller's own stages don't nest
+    with open(html_doc, 'r') as file:
+        while True:
+            with stage("decode"):
+                chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            with stage("parse"):
+                parser.feed(chunk)
+            while parser.boxes:
+                yield parser.boxes.popleft()
+    with stage("parse"):
+        parser.close()
+    while parser.boxes:
+        yield parser.boxes.popleft()
+
+
+def iter_boxes(html_doc: Union[str, Path], stream: Optional[bool] = None) -> Iterator[Box]:
+    """Boxes of a snapshot; streams when asked to, or by default for files over STREAM_THRESHOLD."""
+    if stream is None:
+        stream = Path(html_doc).stat().st_size > STREAM_THRESHOLD
+    if stream:
+        return stream_boxes(html_doc)
+    return iter(parse_boxes(html_doc))
+
+
+def iter_batches(html_doc: Union[str, Path], group: str = "qilin", site: str = "", size: int = BATCH_SIZE,
+                 stream: Optional[bool] = None, scraped: Optional[datetime] = None) -> Iterator[RecordBatch]:
+    """Victims of a snapshot as RecordBatches of at most ``size``; post paths are prefixed with ``site``."""
+    boxes = iter_boxes(html_doc, stream)
+    while True:
+        # Parsing runs in its own stages while the boxes are pulled
+        chunk = list(islice(boxes, size))
+        if not chunk:
+            return
+        with stage("extract"):
+            batch = RecordBatch(group, scraped)
+            for victim, date, website, description, post_path in chunk:
+                batch.append(victim, description, website, date=date, post_url=site + post_path if post_path else "")
+        yield batch
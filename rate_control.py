@@ -0,0 +1,145 @@
+"""
+rate_control.py
+Adaptive per-host request pacing shared by the scrapers.
+
+Each host gets an AIMD (additive increase, multiplicative decrease) budget:
+the allowed request rate grows by a fixed step after every fast, successful
+response and is cut by a factor on 4xx/5xx, captchas, connection errors or
+a latency spike. As in TCP, the rate is cut once per congestion event: the
+other failures of a burst (in-flight requests, retries) are ignored until a
+request issued after the cut succeeds or a few request intervals pass.
+Retry backoff is exponential with full jitter.
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+def host_of(url: str) -> str:
+    """Return the host part of a URL (the URL itself if it has none)."""
+    return urlsplit(url).hostname or url
+
+
+class HostState:
+    """Pacing state for a single host."""
+
+    __slots__ = ("rate", "next_slot", "latency_ewma", "successes", "failures", "cut_at", "hold_until")
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.next_slot = 0.0
+        # Time of the last cut; failures before hold_until belong to the same event
+        self.cut_at = float("-inf")
+        self.hold_until = float("-inf")
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+
+
+class AIMDRateController:
+    """Per-host AIMD rate controller.
+
+    Rates are in requests per second. ``wait()`` blocks until the host's next
+    slot, ``record()`` feeds the outcome of a request back into the budget and
+    ``backoff()`` sleeps before a retry.
+    """
+
+    def __init__(self, initial_rate: float = 0.5, min_rate: float = 0.2, max_rate: float = 4.0,
+                 increase: float = 0.1, decrease: float = 0.5, latency_factor: float = 2.0,
+                 latency_slack: float = 0.5, hold_intervals: float = 2.0,
+                 backoff_base: float = 2.0, backoff_cap: float = 60.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.latency_slack = latency_slack
+        self.hold_intervals = hold_intervals
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self.initial_rate)
+        return state
+
+    def wait(self, url: str) -> float:
+        """Block until the host of ``url`` may be requested again. Returns the time slept."""
+        with self._lock:
+            state = self._state(host_of(url))
+            now = time.monotonic()
+            slot = max(now, state.next_slot)
+            state.next_slot = slot + 1.0 / state.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def record(self, url: str, status: Optional[int] = None, latency: Optional[float] = None,
+               captcha: bool = False, error: bool = False) -> float:
+        """Feed back the outcome of a request and return the host's new rate."""
+        with self._lock:
+            state = self._state(host_of(url))
+            now = time.monotonic()
+            # When the request was sent (approximately, for errors without a latency)
+            issued = now - (latency if latency is not None else state.latency_ewma or 0.0)
+            slow = False
+            if latency is not None:
+                # A spike must also exceed an absolute slack, or jitter on fast hosts counts as congestion
+                if (state.latency_ewma is not None and latency > self.latency_factor * state.latency_ewma
+                        and latency > state.latency_ewma + self.latency_slack):
+                    slow = True
+                state.latency_ewma = latency if state.latency_ewma is None else 0.8 * state.latency_ewma + 0.2 * latency
+
+            if error or captcha or slow or (status is not None and status >= 400):
+                state.failures += 1
+                if now >= state.hold_until:
+                    state.rate = max(self.min_rate, state.rate * self.decrease)
+                    state.cut_at = now
+                    state.hold_until = now + self.hold_intervals / state.rate + (state.latency_ewma or 0.0)
+                    # Push the next slot out so the cut takes effect immediately
+                    state.next_slot = max(state.next_slot, now + 1.0 / state.rate)
+            else:
+                state.successes += 1
+                if issued > state.cut_at:
+                    # Sent after the last cut and fine: that congestion event is over
+                    state.hold_until = float("-inf")
+                state.rate = min(self.max_rate, state.rate + self.increase)
+            return state.rate
+
+    def backoff(self, url: str, attempt: int) -> float:
+        """Sleep a jittered exponential delay before retry ``attempt`` (1-based). Returns the time slept."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+        time.sleep(delay)
+        return delay
+
+    def rate(self, url: str) -> float:
+        """Current allowed request rate for the host of ``url``."""
+        with self._lock:
+            return self._state(host_of(url)).rate
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Snapshot of the per-host rate, latency and outcome counters."""
+        with self._lock:
+            return {
+                host: {
+                    "rate": round(state.rate, 3),
+                    "latency_ewma": round(state.latency_ewma, 3) if state.latency_ewma is not None else None,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                }
+                for host, state in self._hosts.items()
+            }
+
+    def report(self):
+        """Print the current request rate per host."""
+        for host, m in self.metrics().items():
+            print(f"[RATE] {host}: {m['rate']} req/s (latency ~{m['latency_ewma']}s, "
+                  f"ok={m['successes']}, failed={m['failures']})")
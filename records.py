@@ -0,0 +1,79 @@
+"""
+records.py
+Compact columnar batch that the parsers emit instead of one dict per victim.
+
+A RecordBatch holds one list per field, the group name interned once and
+the scrape timestamp captured once per batch, so a backfill no longer
+allocates a dict with repeated keys plus a formatted timestamp string for
+every row. Conversion to a DataFrame happens in one pass over the columns.
+"""
+
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Per-row fields, named as in normalize.SCHEMA
+FIELDS = ('Victim Name', 'Type', 'Description', 'Website', 'Post URL', 'Date', 'Published')
+
+
+class RecordBatch:
+    """Column-oriented victims of a single group scraped at a single time."""
+
+    __slots__ = ('group', 'scraped', 'columns')
+
+    def __init__(self, group: str, scraped: Optional[datetime] = None):
+        self.group = sys.intern(group)
+        self.scraped = (scraped or datetime.now()).replace(microsecond=0)
+        self.columns: Dict[str, List] = {field: [] for field in FIELDS}
+
+    def append(self, victim: str, description: str = '', website: str = '', type: str = '',
+               date: str = '', published: str = '', post_url: str = ''):
+        """Add one victim."""
+        columns = self.columns
+        columns['Victim Name'].append(victim)
+        columns['Type'].append(type)
+        columns['Description'].append(description)
+        columns['Website'].append(website)
+        columns['Post URL'].append(post_url)
+        columns['Date'].append(date)
+        columns['Published'].append(published)
+
+    def __len__(self):
+        return len(self.columns['Victim Name'])
+
+    def column(self, name: str) -> List:
+        """Values of one column."""
+        return self.columns[name]
+
+    def set_column(self, name: str, values: List):
+        """Add or replace a column (e.g. fields merged in from detail pages)."""
+        if len(values) != len(self):
+            raise ValueError(f"column {name!r} has {len(values)} values for {len(self)} rows")
+        self.columns[name] = values
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        """Rows as dicts, built on demand (for debugging and small batches)."""
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            row = dict(zip(names, values))
+            row['Group'] = self.group
+            row['Scraped Date'] = self.scraped
+            yield row
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame with Group as a one-category column and Scraped Date broadcast from the batch."""
+        n = len(self)
+        data = dict(self.columns)
+        data['Group'] = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[self.group])
+        data['Scraped Date'] = np.full(n, np.datetime64(self.scraped, 'ns'))
+        return pd.DataFrame(data)
+
+    def to_csv(self, path: str, **kwargs):
+        self.to_frame().to_csv(path, index=False, **kwargs)
+
+    def to_parquet(self, path: str, **kwargs):
+        """Write Parquet (needs pyarrow or fastparquet)."""
+        self.to_frame().to_parquet(path, index=False, **kwargs)
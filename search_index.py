@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+search_index.py
+Incremental SQLite FTS5 full-text index over collected victims.
+
+Every batch the scrapers write is upserted in a single transaction; the
+FTS table is an external-content index kept in sync by triggers, so it
+never needs a rebuild. Hits are ranked with bm25, weighting victim name
+over website over description.
+
+Usage:
+    python search_index.py search "hospital AND texas" --limit 20
+    python search_index.py add akira.xlsx play.xlsx qilin_urls.csv --group qilin
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+SEARCH_INDEX_FILE = "victims_search.db"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS victims (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    grp TEXT NOT NULL DEFAULT '',
+    victim TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    website TEXT NOT NULL DEFAULT '',
+    post_url TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    updated TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS victims_fts USING fts5(
+    victim, description, website,
+    content='victims', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS victims_ai AFTER INSERT ON victims BEGIN
+    INSERT INTO victims_fts(rowid, victim, description, website)
+    VALUES (new.id, new.victim, new.description, new.website);
+END;
+CREATE TRIGGER IF NOT EXISTS victims_ad AFTER DELETE ON victims BEGIN
+    INSERT INTO victims_fts(victims_fts, rowid, victim, description, website)
+    VALUES ('delete', old.id, old.victim, old.description, old.website);
+END;
+CREATE TRIGGER IF NOT EXISTS victims_au AFTER UPDATE ON victims BEGIN
+    INSERT INTO victims_fts(victims_fts, rowid, victim, description, website)
+    VALUES ('delete', old.id, old.victim, old.description, old.website);
+    INSERT INTO victims_fts(rowid, victim, description, website)
+    VALUES (new.id, new.victim, new.description, new.website);
+END;
+"""
+
+# Non-empty incoming values win, empty ones keep what is already indexed;
+# rows whose merged values are unchanged are left alone
+UPSERT_SQL = """
+INSERT INTO victims (key, grp, victim, description, website, post_url, date)
+VALUES (:key, :grp, :victim, :description, :website, :post_url, :date)
+ON CONFLICT(key) DO UPDATE SET
+    grp = COALESCE(NULLIF(excluded.grp, ''), grp),
+    victim = COALESCE(NULLIF(excluded.victim, ''), victim),
+    description = COALESCE(NULLIF(excluded.description, ''), description),
+    website = COALESCE(NULLIF(excluded.website, ''), website),
+    post_url = COALESCE(NULLIF(excluded.post_url, ''), post_url),
+    date = COALESCE(NULLIF(excluded.date, ''), date),
+    updated = datetime('now')
+WHERE COALESCE(NULLIF(excluded.grp, ''), grp) != grp
+   OR COALESCE(NULLIF(excluded.victim, ''), victim) != victim
+   OR COALESCE(NULLIF(excluded.description, ''), description) != description
+   OR COALESCE(NULLIF(excluded.website, ''), website) != website
+   OR COALESCE(NULLIF(excluded.post_url, ''), post_url) != post_url
+   OR COALESCE(NULLIF(excluded.date, ''), date) != date
+"""
+
+SEARCH_SQL = """
+SELECT v.grp, v.victim, v.website, v.date, v.post_url,
+       snippet(victims_fts, 1, '[', ']', '...', 16) AS snippet,
+       bm25(victims_fts, 10.0, 1.0, 5.0) AS rank
+FROM victims_fts JOIN victims v ON v.id = victims_fts.rowid
+WHERE victims_fts MATCH :query {group_filter}
+ORDER BY rank
+LIMIT :limit
+"""
+
+
+def _text(value) -> str:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+
+class SearchIndex:
+    """SQLite FTS5 index of victims keyed by post URL (or group + name)."""
+
+    def __init__(self, path: str = SEARCH_INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA_SQL)
+
+    def close(self):
+        self.conn.close()
+
+    def upsert(self, rows: Iterable[Dict[str, str]]) -> int:
+        """Insert or update a batch atomically; returns the number of rows changed."""
+        with self.conn:
+            cursor = self.conn.executemany(UPSERT_SQL, rows)
+        return max(cursor.rowcount, 0)
+
+    def add_frame(self, df: pd.DataFrame) -> int:
+        """Index a normalized scraper DataFrame (see normalize.SCHEMA)."""
+        rows = []
+        for record in df.to_dict('records'):
+            group = _text(record.get('Group'))
+            victim = _text(record.get('Victim Name'))
+            post_url = _text(record.get('Post URL'))
+            date = record.get('Date')
+            rows.append({
+                'key': post_url or f"{group}:{victim}",
+                'grp': group,
+                'victim': victim,
+                'description': _text(record.get('Description')),
+                'website': _text(record.get('Website')),
+                'post_url': post_url,
+                'date': '' if date is None or pd.isna(date) else str(date),
+            })
+        return self.upsert(rows)
+
+    def add_descriptions(self, rows: Iterable[Dict[str, str]], group: str) -> int:
+        """Index url/description rows from the URL scrapers, keyed by the post URL."""
+        return self.upsert({
+            'key': row['url'], 'grp': group, 'victim': '', 'description': _text(row.get('description')),
+            'website': '', 'post_url': row['url'], 'date': '',
+        } for row in rows if row.get('url'))
+
+    def search(self, query: str, limit: int = 20, group: Optional[str] = None) -> List[sqlite3.Row]:
+        """Ranked hits for an FTS5 query; falls back to plain terms if the syntax is invalid."""
+        sql = SEARCH_SQL.format(group_filter="AND v.grp = :group" if group else "")
+        params = {'query': query, 'limit': limit, 'group': group}
+        try:
+            return self.conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            params['query'] = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+            return self.conn.execute(sql, params).fetchall()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM victims").fetchone()[0]
+
+
+def update_search_index(df: pd.DataFrame, path: str = SEARCH_INDEX_FILE) -> int:
+    """Add a run's records to the search index; returns the number of rows changed."""
+    try:
+        index = SearchIndex(path)
+        try:
+            return index.add_frame(df)
+        finally:
+            index.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error updating search index {path}: {e}")
+        return 0
+
+
+def update_search_index_urls(rows: List[Dict[str, str]], group: str, path: str = SEARCH_INDEX_FILE) -> int:
+    """Add url/description rows to the search index; returns the number of rows changed."""
+    try:
+        index = SearchIndex(path)
+        try:
+            return index.add_descriptions(rows, group)
+        finally:
+            index.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error updating search index {path}: {e}")
+        return 0
+
+
+def main():
+    """Query the index or backfill it from scraper output files."""
+    ap = argparse.ArgumentParser(description="Full-text search over collected victims.")
+    # Shared by the subcommands so --index may follow them
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--index", default=SEARCH_INDEX_FILE, help="Index database")
+    sub = ap.add_subparsers(dest="command", required=True)
+    search_ap = sub.add_parser("search", parents=[common], help="Run a query (FTS5 syntax: AND, OR, NOT, \"phrases\", prefix*)")
+    search_ap.add_argument("query", help="Search query")
+    search_ap.add_argument("--limit", type=int, default=20, help="Maximum number of hits")
+    search_ap.add_argument("--group", help="Only return hits from this group")
+    add_ap = sub.add_parser("add", parents=[common], help="Index scraper output files (xlsx, or csv with url/description)")
+    add_ap.add_argument("files", nargs="+", help="Files to index")
+    add_ap.add_argument("--group", default="", help="Group for url/description CSV files")
+    args = ap.parse_args()
+
+    index = SearchIndex(args.index)
+    if args.command == "add":
+        for path in args.files:
+            try:
+                df = pd.read_excel(path, engine="openpyxl") if path.endswith(".xlsx") else pd.read_csv(path)
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                sys.exit(1)
+            if "url" in df.columns and "Victim Name" not in df.columns:
+                changed = index.add_descriptions(df.fillna("").to_dict("records"), args.group)
+            else:
+                changed = index.add_frame(df)
+            print(f"{path}: {changed} rows indexed")
+        print(f"Index holds {len(index)} victims")
+        return
+
+    start = time.perf_counter()
+    hits = index.search(args.query, args.limit, args.group)
+    elapsed = (time.perf_counter() - start) * 1000
+    for i, hit in enumerate(hits, 1):
+        print(f"{i:>3}. [{hit['grp']}] {hit['victim'] or hit['post_url']}"
+              f"{' (' + hit['website'] + ')' if hit['website'] else ''}{' ' + hit['date'][:10] if hit['date'] else ''}")
+        if hit['snippet']:
+            print(f"     {hit['snippet']}")
+    print(f"{len(hits)} hits in {elapsed:.1f} ms ({len(index)} victims indexed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""The streaming qilin snapshot parser must agree with the BeautifulSoup one."""
+
+import pytest
+
+from qilin_snapshot import iter_batches, parse_boxes, stream_boxes
+
+DATE = "item_box-info__item d-flex align-items-center"
+
+SNAPSHOT = f"""<!DOCTYPE html>
+<html><head><title>qilin</title></head><body>
+<div class="container"><div class="row">
+<!-- <div class="item_box"><a class="item_box-title">commented out</a></div> -->
+<div class="item_box col-12">
+  <div class="item_box-photo"><div class="inner"><img src="logo.png"></div></div>
+  <a class="item_box-title" href="#">  Acme &amp; Sons Ltd </a>
+  <div class="item_box-info">
+    <div class="{DATE}"><span>Views</span> 120</div>
+    <div class="{DATE}"><span>2025-03-01</span></div>
+    <a class="item_box-info__link" href=" https://acme.example.com ">acme</a>
+  </div>
+  <div class="item_box_text">Engineering <div class="more"><b>firm</b></div> &lt;UK&gt;</div>
+  <div class="item_box_text">second description is ignored</div>
+  <a class="learn_more" href="/site/view?uuid=1">Learn more</a>
+</div>
+<div class="item_box">
+  <a class="item_box-title" href="#">No Description GmbH</a>
+  <div class="{DATE} extra"><span>not a date field</span></div>
+  <div class="{DATE}">2025-02-14</div>
+  <a class="learn_more" href="/site/view?uuid=2">Learn more</a>
+</div>
+<div class="item_box">
+  <div><div><a class="item_box-title">Deeply Nested Inc</a></div></div>
+  <div class="item_box_text"></div>
+  <a class="learn_more" href="/site/view?uuid=3">Learn more</a>
+</div>
+</div></div>
+</body></html>
+"""
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "qilin-0123.html"
+    path.write_text(SNAPSHOT)
+    return path
+
+
+def test_parse_boxes_fields(snapshot):
+    assert parse_boxes(snapshot) == [
+        ("Acme & Sons Ltd", "2025-03-01", "acme.example.com", "Engineering firm <UK>", "/site/view?uuid=1"),
+        ("No Description GmbH", "", "", "N/A", "/site/view?uuid=2"),
+        ("Deeply Nested Inc", "", "", "", "/site/view?uuid=3"),
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096])
+def test_stream_matches_tree(snapshot, chunk_size):
+    assert list(stream_boxes(snapshot, chunk_size)) == parse_boxes(snapshot)
+
+
+def test_iter_batches(snapshot):
+    batches = list(iter_batches(snapshot, site="http://q.onion", size=2, stream=True))
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0].column("Post URL") == ["http://q.onion/site/view?uuid=1", "http://q.onion/site/view?uuid=2"]
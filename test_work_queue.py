@@ -0,0 +1,130 @@
+"""Lease handling of the shared work queue, with two workers on one database."""
+
+import pytest
+
+import work_queue
+from work_queue import WorkQueue, process_queue
+
+URLS = ["http://a.onion/1", "http://a.onion/2", "http://a.onion/3"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(work_queue.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def queues(tmp_path, clock):
+    path = str(tmp_path / "urls.queue")
+    first = WorkQueue(path, lease_seconds=60, max_attempts=2)
+    second = WorkQueue(path, lease_seconds=60, max_attempts=2)
+    first.add(URLS)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_claims_do_not_overlap(queues):
+    first, second = queues
+    a = first.claim("w1", 2)
+    b = second.claim("w2", 2)
+    assert [lease.url for lease in a] == URLS[:2]
+    assert [lease.url for lease in b] == URLS[2:]
+    assert second.claim("w2", 2) == []
+    assert first.counts()["leased"] == 3
+
+
+def test_expired_lease_is_reclaimed_and_stale_result_discarded(queues, clock):
+    first, second = queues
+    [lease] = first.claim("w1", 1)
+    clock[0] += 61
+    [reclaimed] = second.claim("w2", 1)
+    assert reclaimed.url == lease.url
+    assert reclaimed.token != lease.token
+
+    assert first.complete(lease, "late") is False
+    assert second.complete(reclaimed, "fresh") is True
+    assert first.results() == [{"url": URLS[0], "description": "fresh"}]
+
+
+def test_renew_keeps_lease(queues, clock):
+    first, second = queues
+    held = first.claim("w1", 3)
+    clock[0] += 50
+    assert first.renew(held) == 3
+    clock[0] += 50
+    assert second.claim("w2", 3) == []
+
+
+def test_fail_retries_then_marks_failed(queues):
+    first, second = queues
+    [lease] = first.claim("w1", 1)
+    assert first.fail(lease, "timeout") is True
+    assert first.counts()["pending"] == 3
+
+    [retry] = second.claim("w2", 1)
+    assert retry.url == lease.url
+    assert second.fail(retry, "timeout") is True
+    assert second.counts()["failed"] == 1
+    assert second.fail(retry, "again") is False
+
+
+def test_expired_lease_over_max_attempts_fails(queues, clock):
+    first, second = queues
+    first.claim("w1", 1)
+    clock[0] += 61
+    second.claim("w2", 1)
+    clock[0] += 61
+    second.claim("w2", 1)
+    assert second.counts()["failed"] == 1
+
+
+def test_release_does_not_count_an_attempt(queues):
+    first, second = queues
+    held = first.claim("w1", 3)
+    first.release(held[1:])
+    assert first.counts() == {"pending": 2, "leased": 1, "done": 0, "failed": 0}
+    assert first.complete(held[1], "released") is False
+
+    reclaimed = second.claim("w2", 3)
+    assert [lease.url for lease in reclaimed] == URLS[1:]
+    attempts = dict(second.conn.execute("SELECT url, attempts FROM tasks"))
+    assert attempts == {URLS[0]: 1, URLS[1]: 1, URLS[2]: 1}
+
+
+def test_only_one_worker_exports(queues):
+    first, second = queues
+    assert first.claim_export() is False
+    for lease in first.claim("w1", 3):
+        first.complete(lease, "ok")
+    assert [second.claim_export(), first.claim_export()] == [True, False]
+
+    # New work makes the drained queue exportable once more
+    first.add(["http://a.onion/4"])
+    [lease] = second.claim("w2", 1)
+    second.complete(lease, "ok")
+    assert [first.claim_export(), second.claim_export()] == [True, False]
+
+
+def test_process_queue_drains_and_releases_on_error(tmp_path):
+    path = str(tmp_path / "urls.queue")
+    queue = WorkQueue(path)
+    pages = {URLS[0]: "<p>one</p>", URLS[2]: "<p>three</p>"}
+    rows = process_queue(queue, URLS, 2, pages.get, lambda html: html[3:-4])
+    assert rows == [{"url": URLS[0], "description": "one"},
+                    {"url": URLS[1], "description": ""},
+                    {"url": URLS[2], "description": "three"}]
+    assert queue.counts()["failed"] == 1
+    # A second worker finding the queue already drained leaves the output to the first
+    assert process_queue(WorkQueue(path), URLS, 2, pages.get, str) is None
+
+    def broken(url):
+        raise RuntimeError("interrupted")
+
+    queue.requeue()
+    with pytest.raises(RuntimeError):
+        process_queue(queue, [], 2, broken, str)
+    assert queue.counts()["leased"] == 0
+    queue.close()
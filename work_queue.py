@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+work_queue.py
+Durable SQLite work queue so several URL-scraper workers (on one machine
+or on several nodes sharing a volume) can split a URL list without
+manual partitioning.
+
+Workers claim small batches under a lease. A worker that crashes simply
+stops renewing, its leases expire and the URLs go back to other workers.
+A result is only committed by the worker still holding the URL's lease
+token, in the same transaction that marks the URL done, so every URL
+ends up with exactly one result. Once the queue is drained exactly one
+worker is handed the results to write out (see claim_export); the others
+just exit, and `export` collects them at any time.
+
+The database uses a rollback journal rather than WAL, since WAL needs
+shared memory and does not work across machines. The shared volume must
+support POSIX locks (e.g. NFSv4 with locking, or SMB). Lease expiry
+compares wall clocks, so the nodes' clocks should be NTP-synced.
+
+Usage:
+    python work_queue.py add qilin.queue urls.txt
+    python work_queue.py status qilin.queue
+    python work_queue.py export qilin.queue results.csv
+    python work_queue.py requeue qilin.queue
+"""
+
+import argparse
+import csv
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    description TEXT,
+    error TEXT,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks(state, lease_expires);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Seconds an idle worker waits before checking for expired leases or
+# for the other workers to finish
+POLL_INTERVAL = 2.0
+
+# States: pending -> leased -> done, or back to pending on failure until
+# max_attempts is reached, then failed
+STATES = ("pending", "leased", "done", "failed")
+
+
+class Lease(NamedTuple):
+    url: str
+    token: str
+
+
+def worker_id() -> str:
+    """Identify this worker as host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """URL work queue with leased claims backed by one SQLite file."""
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 5):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA_SQL)
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two workers can
+        # never select the same rows before one of them updates them
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    @staticmethod
+    def _meta(conn, key: str, default: int) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(conn, key: str, value: int):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _new_round(self, conn):
+        # New work for the queue: its results need exporting again once drained
+        self._set_meta(conn, "round", self._meta(conn, "round", 0) + 1)
+
+    def add(self, urls: Iterable[str]) -> int:
+        """Enqueue URLs; ones already queued are ignored. Returns the number added."""
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tasks (url) VALUES (?)", ((url,) for url in urls))
+            added = conn.total_changes - before
+            if added:
+                self._new_round(conn)
+            return added
+
+    def claim(self, worker: str, n: int) -> List[Lease]:
+        """Lease up to n pending (or expired) URLs to a worker."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', token = NULL, error = COALESCE(error, 'lease expired') "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, self.max_attempts))
+            urls = [row[0] for row in conn.execute(
+                "SELECT url FROM tasks WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT ?", (now, n))]
+            leases = [Lease(url, uuid.uuid4().hex) for url in urls]
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', worker = ?, token = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE url = ?",
+                ((worker, lease.token, now + self.lease_seconds, lease.url) for lease in leases))
+        return leases
+
+    def renew(self, leases: Iterable[Lease]) -> int:
+        """Extend leases still held; returns how many were."""
+        expires = time.time() + self.lease_seconds
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("UPDATE tasks SET lease_expires = ? WHERE token = ? AND state = 'leased'",
+                             ((expires, lease.token) for lease in leases))
+            return conn.total_changes - before
+
+    def complete(self, lease: Lease, description: str) -> bool:
+        """Commit a URL's result; False if the lease was lost and the result discarded."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET state = 'done', description = ?, error = NULL, token = NULL, "
+                "lease_expires = NULL, finished = ? WHERE url = ? AND token = ? AND state = 'leased'",
+                (description, time.time(), lease.url, lease.token))
+            return cursor.rowcount == 1
+
+    def fail(self, lease: Lease, error: str = "") -> bool:
+        """Give a URL back for another attempt, or mark it failed after max_attempts."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, token = NULL, lease_expires = NULL WHERE url = ? AND token = ? AND state = 'leased'",
+                (self.max_attempts, error, lease.url, lease.token))
+            return cursor.rowcount == 1
+
+    def release(self, leases: Iterable[Lease]):
+        """Hand unprocessed leases back without counting an attempt (clean shutdown)."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE tasks SET state = 'pending', token = NULL, lease_expires = NULL, "
+                "attempts = attempts - 1 WHERE token = ? AND state = 'leased'",
+                ((lease.token,) for lease in leases))
+
+    def requeue(self) -> int:
+        """Put failed URLs back as pending with a fresh attempt budget."""
+        with self._transaction() as conn:
+            requeued = conn.execute("UPDATE tasks SET state = 'pending', attempts = 0, error = NULL "
+                                    "WHERE state = 'failed'").rowcount
+            if requeued:
+                self._new_round(conn)
+            return requeued
+
+    def claim_export(self) -> bool:
+        """True for exactly one caller once the queue is drained (again after each add/requeue)."""
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM tasks WHERE state IN ('pending', 'leased') LIMIT 1").fetchone():
+                return False
+            current = self._meta(conn, "round", 0)
+            if self._meta(conn, "exported", -1) == current:
+                return False
+            self._set_meta(conn, "exported", current)
+            return True
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state"))
+        return counts
+
+    def remaining(self) -> int:
+        """URLs not yet done or failed."""
+        return self.conn.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def progress(self, window: float = 600.0) -> str:
+        """One-line summary with the recent completion rate and ETA."""
+        counts = self.counts()
+        total = sum(counts.values())
+        now = time.time()
+        recent, first = self.conn.execute("SELECT COUNT(*), MIN(finished) FROM tasks WHERE state = 'done' "
+                                          "AND finished >= ?", (now - window,)).fetchone()
+        # Measure over the time actually covered so a fresh queue isn't underestimated
+        rate = recent / max(now - first, 1.0) * 60 if recent else 0.0
+        left = counts["pending"] + counts["leased"]
+        eta = f", ETA {left / rate:.0f} min" if rate and left else ""
+        return (f"Queue: {counts['done']}/{total} done, {counts['failed']} failed, {counts['leased']} leased, "
+                f"{counts['pending']} pending; {rate:.1f} URLs/min over the last {window / 60:.0f} min{eta}")
+
+    def workers(self) -> List[sqlite3.Row]:
+        """Per-worker completed counts and currently held leases."""
+        self.conn.row_factory = sqlite3.Row
+        try:
+            return self.conn.execute(
+                "SELECT worker, SUM(state = 'done') AS done, SUM(state = 'leased') AS leased, "
+                "MAX(finished) AS last_finished FROM tasks WHERE worker IS NOT NULL "
+                "GROUP BY worker ORDER BY done DESC").fetchall()
+        finally:
+            self.conn.row_factory = None
+
+    def results(self) -> List[Dict[str, str]]:
+        """url/description rows in queue order; failed URLs get an empty description."""
+        return [{"url": url, "description": description or ""} for url, description in self.conn.execute(
+            "SELECT url, description FROM tasks WHERE state IN ('done', 'failed') ORDER BY id")]
+
+
+def process_queue(queue: WorkQueue, urls: Iterable[str], batch_size: int,
+                  fetch: Callable[[str], Optional[str]], extract: Callable[[str], str],
+                  start_batch: Optional[Callable[[], None]] = None) -> Optional[List[Dict[str, str]]]:
+    """
+    Work through a shared queue until it is drained. Returns every result in
+    it to the one worker that should write them out, None to the others.
+
+    fetch(url) returns the page HTML (None or "" on failure), extract(html)
+    its description, and start_batch() runs after each claim (e.g. a fresh
+    session and Tor circuit).
+    """
+    worker = worker_id()
+    print(f"Worker {worker}: {queue.add(urls)} new URLs added to {queue.path}")
+    held = []
+    try:
+        while True:
+            held = queue.claim(worker, batch_size)
+            if not held:
+                if not queue.remaining():
+                    break
+                # Other workers hold the rest; wait for them to finish or for their leases to expire
+                time.sleep(POLL_INTERVAL)
+                continue
+            print(f"\nClaimed {len(held)} URLs")
+            if start_batch:
+                start_batch()
+
+            while held:
+                lease = held[0]
+                print(f"[{worker}] {lease.url}")
+                html = fetch(lease.url)
+                if not html:
+                    queue.fail(lease, "no content fetched")
+                    print("  -> No content fetched, returned to the queue")
+                else:
+                    description = extract(html)
+                    if queue.complete(lease, description):
+                        print(f"  -> description: {description[:50]}... (len={len(description)})")
+                    else:
+                        print("  -> Lease expired and the URL was reclaimed; result discarded")
+                held.pop(0)
+                # Keep the rest of the batch from expiring while this worker is alive
+                queue.renew(held)
+            print(queue.progress())
+    finally:
+        # Hand back whatever was claimed but not processed (interrupt or error)
+        if held:
+            queue.release(held)
+    if not queue.claim_export():
+        return None
+    return queue.results()
+
+
+def read_urls(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    """Manage a work queue: enqueue URLs, check progress, export results."""
+    ap = argparse.ArgumentParser(description="Shared SQLite work queue for the URL scrapers.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    add_ap = sub.add_parser("add", help="Enqueue the URLs in a file (one per line)")
+    add_ap.add_argument("queue", help="Queue database")
+    add_ap.add_argument("urls_file", help="Text file of URLs")
+    status_ap = sub.add_parser("status", help="Show progress and per-worker counts")
+    status_ap.add_argument("queue", help="Queue database")
+    export_ap = sub.add_parser("export", help="Write finished results to CSV (url, description)")
+    export_ap.add_argument("queue", help="Queue database")
+    export_ap.add_argument("out_csv", help="Output CSV file")
+    requeue_ap = sub.add_parser("requeue", help="Retry URLs that ran out of attempts")
+    requeue_ap.add_argument("queue", help="Queue database")
+    args = ap.parse_args()
+
+    if args.command != "add" and not os.path.exists(args.queue):
+        print(f"Error: {args.queue} not found.")
+        sys.exit(1)
+    queue = WorkQueue(args.queue)
+    if args.command == "add":
+        try:
+            urls = read_urls(args.urls_file)
+        except FileNotFoundError:
+            print(f"Error: {args.urls_file} not found.")
+            sys.exit(1)
+        print(f"Added {queue.add(urls)} of {len(urls)} URLs")
+    elif args.command == "requeue":
+        print(f"Requeued {queue.requeue()} failed URLs")
+    elif args.command == "export":
+        rows = queue.results()
+        with open(args.out_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["url", "description"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved {len(rows)} rows to {args.out_csv}")
+        return
+    print(queue.progress())
+    for row in queue.workers():
+        last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["last_finished"])) if row["last_finished"] else "-"
+        print(f"  {row['worker']:<32} done {row['done']:>6}  leased {row['leased']:>4}  last {last}")
+
+
+if __name__ == "__main__":
+    main()